@@ -3,52 +3,467 @@ from docx import Document
 from docx.shared import Inches, Pt
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.enum.text import WD_BREAK, WD_PARAGRAPH_ALIGNMENT
 from PIL import Image
+import argparse
+import contextlib
+import glob
+import hashlib
 import io
-from tkinter import Tk, filedialog
-
-def pdf_to_images(pdf_path):
-    doc = fitz.open(pdf_path)
-    images = []
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)  # load page
-        pix = page.get_pixmap()  # render page to an image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        images.append(img)
-    return images
-
-def add_images_to_doc(images, doc):
-    for image in images:
-        image_stream = io.BytesIO()
-        image.save(image_stream, format='PNG')
-        image_stream.seek(0)  # Ensure the stream position is at the beginning
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-        # Create a new paragraph for the image to control page breaks
-        p = doc.add_paragraph()
-        r = p.add_run()
-        r.add_picture(image_stream, width=Inches(6))
-        
-        # Check if the image causes an automatic page break and adjust if necessary
-        if len(doc.element.xpath('//w:lastRenderedPageBreak')) > 0:
-            p._element.getparent().remove(p._element)
-            doc.add_page_break()
-            p = doc.add_paragraph()
-            r = p.add_run()
-            r.add_picture(image_stream, width=Inches(6))
-        doc.add_paragraph()  # Ensure separation of images
+# Page selections: "report.pdf:1-3,10-20" takes pages 1-3 and 10-20 only.
+# "7" is a single page, "10-" runs to the last page and "-3" is the first three.
+PAGE_SPEC = re.compile(r"[\d\s,-]+")
 
-def add_toc(doc, toc_entries):
-    toc = doc.add_paragraph()
-    toc.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    run = toc.add_run('Table of Contents')
-    run.bold = True
-    run.font.size = Pt(14)
-    doc.add_paragraph()
-
-    for toc_entry in toc_entries:
-        p = doc.add_paragraph()
-        run = p.add_run(toc_entry['title'])
+def split_source(source):
+    # "file.pdf:1-3" -> ("file.pdf", "1-3"); plain paths (including Windows
+    # drive letters) come back with no spec
+    path, sep, spec = source.rpartition(":")
+    if sep and path and PAGE_SPEC.fullmatch(spec):
+        return path, spec
+    return source, None
+
+def parse_page_spec(spec, page_count):
+    # Returns 0-based (start, stop) ranges, in the order given
+    ranges = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        first, dash, last = item.partition("-")
+        try:
+            start = int(first) if first.strip() else 1
+            stop = (int(last) if last.strip() else page_count) if dash else start
+        except ValueError:
+            raise ValueError(f"bad page range {item!r}") from None
+        if not 1 <= start <= stop <= page_count:
+            raise ValueError(f"page range {item!r} is outside 1-{page_count}")
+        ranges.append((start - 1, stop))
+    if not ranges:
+        raise ValueError(f"empty page range {spec!r}")
+    return ranges
+
+def format_ranges(ranges):
+    return ", ".join(f"{start + 1}-{stop}" if stop - start > 1 else str(stop) for start, stop in ranges)
+
+def pdf_to_images(pdf_path, pages=None):
+    # Generator: only the page currently being encoded/inserted is held in memory.
+    # pages is an optional page-range spec such as "1-3,10-20"; other pages
+    # are never loaded.
+    with fitz.open(pdf_path) as doc:
+        for start, stop in parse_page_spec(pages, len(doc)) if pages else [(0, len(doc))]:
+            for page_num in range(start, stop):
+                page = doc.load_page(page_num)  # load page
+                pix = page.get_pixmap()  # render page to an image
+                yield Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+# How pages are turned into images; passed as a whole to every render worker.
+# max_width/max_height (inches) are the box a page image is displayed in.
+# cache_dir/cache_max_bytes enable the on-disk RenderCache.
+# passthrough embeds the original image of single-image (scanned) pages.
+RenderOptions = namedtuple("RenderOptions",
+                           "codec quality dpi color max_width max_height cache_dir cache_max_bytes passthrough",
+                           defaults=("png", 85, 150, "color", 6.0, 9.0, None, 2 * 1024 ** 3, True))
+# One encoded page image, ready to insert. source is how it was produced:
+# "render", "passthrough", "memo" (repeat of an earlier page) or "cache".
+EncodedPage = namedtuple("EncodedPage", "data ext width height encode_seconds render_seconds source",
+                         defaults=(0.0, "render"))
+
+CODECS = ("png", "jpeg", "auto")
+COLOR_MODES = ("color", "gray", "mono", "auto")
+QUALITY_PRESETS = {"draft": 96, "screen": 150, "print": 300}  # DPI at the displayed size
+AUTO_PNG_COVERAGE = 0.5  # "auto" keeps PNG when one colour covers this much of the page
+PASSTHROUGH_COVERAGE = 0.95  # a page image must cover this much of the page to replace it
+PASSTHROUGH_ASPECT = 0.01  # ... and its placement may differ this much from the page's proportions
+WORD_IMAGE_FORMATS = ("png", "jpeg", "jpg", "gif", "bmp", "tiff")  # embedded as-is, no conversion
+INVISIBLE_TEXT = 3  # get_texttrace span type of an OCR text layer
+
+def encode_pixmap(pix, codec="png", quality=85):
+    # Encode straight from the pixmap buffer, without a PIL round trip.
+    # "auto" picks PNG for flat text/line-art pages (dominated by one colour,
+    # usually the paper) and JPEG for photos and scans.
+    if pix.n == 1 and codec == "mono":
+        return encode_mono(pix)
+    if codec == "auto":
+        coverage, _ = pix.color_topusage()
+        codec = "png" if coverage >= AUTO_PNG_COVERAGE else "jpeg"
+    started = time.perf_counter()
+    if codec == "jpeg":
+        data = pix.tobytes("jpeg", jpg_quality=quality)
+    else:
+        data = pix.tobytes("png")
+    return EncodedPage(data, codec, pix.width, pix.height, time.perf_counter() - started)
+
+def encode_mono(pix):
+    # 1-bit PNG; fitz has no bilevel output, so threshold through Pillow
+    started = time.perf_counter()
+    image = Image.frombytes("L", [pix.width, pix.height], pix.samples).convert("1")
+    image_stream = io.BytesIO()
+    image.save(image_stream, format='PNG', optimize=False)
+    return EncodedPage(image_stream.getvalue(), "png", pix.width, pix.height, time.perf_counter() - started)
+
+def page_matrix(page, options):
+    # Render at exactly the DPI the page will be displayed at: the page is shown
+    # max_width inches wide, or less if its height would not fit max_height.
+    width_in, height_in = page.rect.width / 72, page.rect.height / 72
+    display_width = min(options.max_width, options.max_height * width_in / height_in)
+    zoom = display_width * options.dpi / page.rect.width
+    return fitz.Matrix(zoom, zoom)
+
+def is_neutral(pix):
+    # True when every pixel has R == G == B, i.e. the page has no colour
+    samples = pix.samples
+    return samples[0::3] == samples[1::3] == samples[2::3]
+
+def passthrough_image(page, options=RenderOptions()):
+    # A scanned page is a single image filling the page; when Word can show
+    # its format, embed the original compressed stream instead of rendering
+    # and re-encoding it. Anything else drawn on the page (a mask, rotation,
+    # annotations, vector drawings, visible text) means the page must be
+    # rendered. Returns None in that case.
+    images = page.get_images(full=True)
+    if len(images) != 1 or page.rotation or page.first_annot is not None:
+        return None
+    xref, smask = images[0][:2]
+    info = page.get_image_info(xrefs=True)
+    if smask or len(info) != 1 or info[0]["xref"] != xref:
+        return None
+    a, b, c, d, _, _ = info[0]["transform"]
+    bbox = fitz.Rect(info[0]["bbox"]) & page.rect
+    if b or c or a <= 0 or d <= 0 or bbox.get_area() < PASSTHROUGH_COVERAGE * page.rect.get_area():
+        return None
+    page_aspect = page.rect.height / page.rect.width
+    if abs(bbox.height / bbox.width / page_aspect - 1) > PASSTHROUGH_ASPECT:
+        return None
+    if page.get_drawings() or any(span["type"] != INVISIBLE_TEXT for span in page.get_texttrace()):
+        return None
+    started = time.perf_counter()
+    image = page.parent.extract_image(xref)
+    if (not image or image["ext"] not in WORD_IMAGE_FORMATS or image["colorspace"] not in (1, 3)
+            or (options.color in ("gray", "mono") and image["colorspace"] != 1)):
+        return None
+    # The pixels need not be square (fax scans, images stretched over the
+    # page), so the size reported for layout takes its shape from the page
+    height = max(1, round(image["width"] * page_aspect))
+    return EncodedPage(image["image"], image["ext"], image["width"], height,
+                       time.perf_counter() - started, source="passthrough")
+
+class PageMemo:
+    """Recently encoded pages of this process, keyed by a hash of their pixels.
+
+    Cover sheets, blank pages and repeated forms rasterize to identical
+    pixmaps; a repeat is answered from here instead of being encoded again.
+    Bounded by the total size of the encoded data it holds.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.pages = OrderedDict()
+        self.size = 0
+
+    def key(self, pix, options):
+        sha = hashlib.sha1(pix.samples_mv)
+        sha.update(repr((pix.width, pix.height, pix.n, options.codec, options.quality, options.color,
+                         options.dpi)).encode())
+        return sha.digest()
+
+    def get(self, key):
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+            return page._replace(encode_seconds=0.0, source="memo")
+        return None
+
+    def put(self, key, page):
+        self.pages[key] = page
+        self.size += len(page.data)
+        while self.size > self.max_bytes and self.pages:
+            _, old = self.pages.popitem(last=False)
+            self.size -= len(old.data)
+
+page_memo = PageMemo()
+
+def render_page(page, options=RenderOptions()):
+    if options.passthrough:
+        page_image = passthrough_image(page, options)
+        if page_image is not None:
+            return page_image
+    started = time.perf_counter()
+    matrix = page_matrix(page, options)
+    if options.color in ("gray", "mono"):
+        pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY)
+    else:
+        pix = page.get_pixmap(matrix=matrix)
+        if options.color == "auto" and is_neutral(pix):
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+    pix.set_dpi(options.dpi, options.dpi)
+    render_seconds = time.perf_counter() - started
+    key = page_memo.key(pix, options)
+    encoded = page_memo.get(key)
+    if encoded is None:
+        encoded = encode_pixmap(pix, "mono" if options.color == "mono" else options.codec, options.quality)
+        page_memo.put(key, encoded)
+    return encoded._replace(render_seconds=render_seconds)
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class RenderCache:
+    """On-disk LRU cache of encoded page images shared between merges.
+
+    Entries are keyed by (PDF content hash, page number, render options), so
+    the same appendix merged into many packets is rasterized once. Writes go
+    to a temp file that is renamed into place, so concurrent merges never see
+    a partial entry. Recency is the file mtime, bumped on every hit. Many
+    short-lived instances write to one directory (one per pool task), so the
+    size cap is enforced by evict(), which the merge calls once per volume:
+    past max_bytes the least recently used entries are removed.
+    """
+
+    version = 2  # 2: passthrough sizes follow the page shape, not the pixel grid
+    header = struct.Struct("<4sII8s")  # magic, width, height, ext
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, pdf_hash, page_num, options):
+        settings = (self.version, pdf_hash, page_num, options.codec, options.quality, options.dpi,
+                    options.color, round(options.max_width, 4), round(options.max_height, 4), options.passthrough)
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                magic, width, height, ext = self.header.unpack(f.read(self.header.size))
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except (OSError, struct.error):
+            return None
+        if magic != b"MPWC":
+            return None
+        return EncodedPage(data, ext.rstrip(b"\0").decode(), width, height, 0.0, source="cache")
+
+    def put(self, key, page):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.header.pack(b"MPWC", page.width, page.height, page.ext.encode()))
+                f.write(page.data)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            return
+
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                with contextlib.suppress(OSError):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so eviction does not run again on the very next write
+        for _, size, path in sorted(entries):
+            with contextlib.suppress(OSError):  # another merge may have removed it first
+                os.remove(path)
+                total -= size
+            if total <= self.max_bytes * 0.9:
+                break
+
+def encode_pages(pdf_path, start=0, stop=None, options=RenderOptions(), pdf_hash=None):
+    # Generator: render and encode one page at a time. With a render cache the
+    # document is only opened once a page is missing from it.
+    cache = RenderCache(options.cache_dir, options.cache_max_bytes) if options.cache_dir else None
+    if cache is not None and pdf_hash is None:
+        pdf_hash = file_digest(pdf_path)
+    doc = None
+    try:
+        if stop is None:
+            doc = fitz.open(pdf_path)
+            stop = len(doc)
+        for page_num in range(start, stop):
+            key = cache.key(pdf_hash, page_num, options) if cache else None
+            page = cache.get(key) if cache else None
+            if page is None:
+                doc = doc or fitz.open(pdf_path)
+                page = render_page(doc.load_page(page_num), options)
+                if cache:
+                    cache.put(key, page)
+            if page_num == stop - 1 and doc is not None:
+                doc.close()  # done with this file; don't hold it open while the consumer moves on
+                doc = None
+            yield page
+    finally:
+        if doc is not None:
+            doc.close()
+
+def render_page_range(pdf_path, start, stop, options=RenderOptions(), pdf_hash=None):
+    # Runs in a worker process: open a private document and return encoded pages
+    return list(encode_pages(pdf_path, start, stop, options, pdf_hash))
+
+def render_pdfs(pdf_files, page_counts, options=RenderOptions(), workers=None, pipeline_depth=16,
+                pages_per_task=4, pdf_hashes=None, page_ranges=None):
+    # Render every page of every file in a process pool and yield the encoded
+    # pages in document order. At most pipeline_depth encoded pages (but
+    # at least one task's worth) are in flight or waiting at any time, whatever the
+    # core count, so peak memory grows with neither the page count nor the
+    # host size; workers beyond that many tasks would sit idle, so the pool
+    # is capped to match.
+    # page_ranges optionally gives (start, stop) ranges per file instead of all pages.
+    max_tasks = max(1, pipeline_depth // pages_per_task)
+    workers = min(workers or os.cpu_count() or 1, max_tasks)
+    pdf_hashes = pdf_hashes or [None] * len(pdf_files)
+    page_ranges = page_ranges or [[(0, count)] for count in page_counts]
+    tasks = ((pdf_file, start, min(start + pages_per_task, stop), options, pdf_hash)
+             for pdf_file, ranges, pdf_hash in zip(pdf_files, page_ranges, pdf_hashes)
+             for first, stop in ranges
+             for start in range(first, stop, pages_per_task))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(render_page_range, *task))
+            if len(in_flight) >= max_tasks:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+# Heights of the non-image blocks we emit, for laying out pages without Word
+HEADING_HEIGHT = Pt(40)    # Heading 1 text plus its space before/after
+PARAGRAPH_SPACING = Pt(12)  # slack for the text line around an inline picture
+# Picture paragraphs are written with these instead of the template's 10 pt
+# after and 1.15x line height, which scales with the picture and would
+# overflow the heights PageFlow plans with
+PICTURE_SPACING_XML = '<w:pPr><w:spacing w:before="0" w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+MIN_SHRINK = 0.85           # smallest scale accepted to keep an image under its heading
+EMU_PER_INCH = Inches(1)
+
+class PageFlow:
+    """Running model of the current Word page, so page breaks can be decided
+    from known heights instead of asking the document where Word would break
+    (python-docx never renders pages). Every decision is O(1).
+    """
+
+    def __init__(self, section, image_width=Inches(6)):
+        self.width = min(image_width, section.page_width - section.left_margin - section.right_margin)
+        self.height = section.page_height - section.top_margin - section.bottom_margin
+        self.used = 0
+        self.last_was_image = False
+
+    def new_page(self):
+        self.used = 0
+        self.last_was_image = False
+
+    def add_heading(self):
+        self.used += HEADING_HEIGHT
+        self.last_was_image = False
+
+    def place_image(self, px_width, px_height):
+        # Returns the display size and whether a page break must come first.
+        # One page image per Word page: an image only shares a page with the
+        # heading above it, shrunk slightly if that avoids a lone heading.
+        width, height = self.width, self.width * px_height // px_width
+        limit = self.height - PARAGRAPH_SPACING
+        if height > limit:
+            width, height = width * limit // height, limit
+        needs_break = self.used > 0 and (self.last_was_image or self.used + height > limit)
+        if needs_break and not self.last_was_image:
+            room = limit - self.used
+            if room >= MIN_SHRINK * height:
+                width, height = width * room // height, room
+                needs_break = False
+        if needs_break:
+            self.new_page()
+        self.used += height + PARAGRAPH_SPACING
+        self.last_was_image = True
+        return int(width), int(height), needs_break
+
+    def place_text_page(self):
+        # Returns whether a page break must come first. Reflowed text has no
+        # known height, so the page is treated as full: like a page image it
+        # only shares a Word page with the heading above it.
+        needs_break = self.used > 0 and self.last_was_image
+        if needs_break:
+            self.new_page()
+        self.used = self.height
+        self.last_was_image = True
+        return needs_break
+
+# Document writers: everything merge_pdfs_to_word emits goes through one of
+# these, so the whole document does not have to live in memory
+WRITERS = ("docx", "stream")
+IMAGE_CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "jpg": "image/jpeg", "gif": "image/gif",
+                       "bmp": "image/bmp", "tiff": "image/tiff"}
+RELATIONSHIPS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+IMAGE_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+HYPERLINK_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+class DocxWriter:
+    """Builds the document with python-docx and saves it in one go on close()."""
+
+    def __init__(self, path=None, document=None):
+        self.path = path
+        self.doc = document if document is not None else Document()
+        self.section = self.doc.sections[-1]
+
+    def add_toc(self, toc_entries):
+        toc = self.doc.add_paragraph()
+        toc.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        run = toc.add_run('Table of Contents')
+        run.bold = True
+        run.font.size = Pt(14)
+        self.doc.add_paragraph()
+
+        for toc_entry in toc_entries:
+            self.add_link(toc_entry['title'], 'w:anchor', toc_entry['anchor'])
+
+    def add_volume_index(self, volumes):
+        # Lists every volume of a split merge; the others link to their files
+        p = self.doc.add_paragraph()
+        run = p.add_run('Volumes')
+        run.bold = True
+        run.font.size = Pt(14)
+        for volume in volumes:
+            if volume['target'] is None:
+                self.doc.add_paragraph().add_run(volume['title']).bold = True
+            else:
+                rel_id = self.doc.part.relate_to(volume['target'], RT.HYPERLINK, is_external=True)
+                self.add_link(volume['title'], 'r:id', rel_id)
+
+    def add_link(self, title, attribute, value):
+        p = self.doc.add_paragraph()
+        run = p.add_run(title)
         run.font.color.theme_color = 10  # Apply a color to indicate hyperlink
         r = run._r
         rPr = r.get_or_add_rPr()
@@ -56,49 +471,638 @@ def add_toc(doc, toc_entries):
         rStyle.set(qn('w:val'), 'Hyperlink')
         rPr.append(rStyle)
         hyperlink = OxmlElement('w:hyperlink')
-        hyperlink.set(qn('w:anchor'), toc_entry['anchor'])
+        hyperlink.set(qn(attribute), value)
         hyperlink.append(r)
         p._p.clear_content()
         p._p.append(hyperlink)
 
-def merge_pdfs_to_word(pdf_files, output_word):
-    doc = Document()
-    toc_entries = []
+    def add_heading(self, title, bookmark_id, anchor):
+        # Every document starts on a new page, bookmarked for the TOC
+        heading = self.doc.add_heading(title, level=1)
+        heading.paragraph_format.page_break_before = True
+        bookmark_start = OxmlElement('w:bookmarkStart')
+        bookmark_start.set(qn('w:id'), str(bookmark_id))
+        bookmark_start.set(qn('w:name'), anchor)
+        heading._p.insert(0, bookmark_start)
+
+    def end_bookmark(self, bookmark_id):
+        bookmark_end = OxmlElement('w:bookmarkEnd')
+        bookmark_end.set(qn('w:id'), str(bookmark_id))
+        self.doc._body._element.append(bookmark_end)
 
-    for idx, pdf_file in enumerate(pdf_files):
-        title = f"Document {idx + 1}: {pdf_file.split('/')[-1]}"
-        anchor = f"bookmark_{idx}"
-        toc_entries.append({'title': title, 'anchor': anchor})
+    def add_picture(self, data, ext, width, height, page_break=False):
+        # A needed break goes in the picture's own run, so the picture starts
+        # at the top of the new page without an empty line. python-docx
+        # already stores identical image bytes as one part.
+        p = self.doc.add_paragraph()
+        p.paragraph_format.space_before = Pt(0)
+        p.paragraph_format.space_after = Pt(0)
+        p.paragraph_format.line_spacing = 1.0
+        r = p.add_run()
+        if page_break:
+            r.add_break(WD_BREAK.PAGE)
+        r.add_picture(io.BytesIO(data), width=width, height=height)
 
-    # Add TOC at the beginning
-    add_toc(doc, toc_entries)
-    doc.add_page_break()
+    def add_text(self, runs, page_break_before=False):
+        # runs: (text, size in points, bold, italic)
+        p = self.doc.add_paragraph()
+        for text, size, bold, italic in runs:
+            run = p.add_run(text)
+            run.font.size = Pt(size)
+            run.bold = bold or None
+            run.italic = italic or None
+        if page_break_before:
+            p.paragraph_format.page_break_before = True
 
-    for idx, pdf_file in enumerate(pdf_files):
-        title = f"Document {idx + 1}: {pdf_file.split('/')[-1]}"
-        anchor = f"bookmark_{idx}"
+    def close(self):
+        if self.path:
+            self.doc.save(self.path)
 
-        # Create bookmarks and add images
-        heading = doc.add_heading(title, level=1)
+    def abort(self):
+        pass
 
-        # Add the bookmark start to the heading
-        bookmark_start = OxmlElement('w:bookmarkStart')
-        bookmark_start.set(qn('w:id'), str(idx))
-        bookmark_start.set(qn('w:name'), anchor)
-        heading._p.insert(0, bookmark_start)
+class StreamingDocxWriter:
+    """Writes the .docx zip incrementally, with memory use independent of page count.
 
-        # Add the bookmark end after the images
-        images = pdf_to_images(pdf_file)
-        add_images_to_doc(images, doc)
-        doc.add_page_break()
+    The parts of python-docx's default template go into the archive first and
+    every picture is added to it as soon as it arrives. Paragraph XML and the
+    image relationships are spooled to temporary files and copied into
+    word/document.xml and its .rels on close(). The archive is written next
+    to path and renamed into place once complete.
+    """
 
-        bookmark_end = OxmlElement('w:bookmarkEnd')
-        bookmark_end.set(qn('w:id'), str(idx))
-        doc._body._element.append(bookmark_end)
+    def __init__(self, path):
+        self.path = path
+        template = Document()
+        self.section = template.sections[-1]
+        main = template.part
+        blob = main.blob
+        body = blob.index(b"<w:body>") + len(b"<w:body>")
+        self.document_head = blob[:body]
+        self.document_tail = blob[blob.index(b"<w:sectPr", body):]
+        rels = main.rels.xml
+        self.rels_head = rels[:rels.rindex(b"</Relationships>")]
+        self.content_types = {part.partname: part.content_type for part in main.package.iter_parts()}
+        self.media_types = set()
+        self.media = {}  # SHA-1 of image bytes -> relationship id, so repeats share one part
+        self.images = 0
+        self.shapes = 0
+        self.links = 0
+
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.archive = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+        self.body = tempfile.TemporaryFile()
+        self.rels = tempfile.TemporaryFile()
+        self.archive.writestr("_rels/.rels", main.package.rels.xml)
+        for part in main.package.iter_parts():
+            if part is not main:
+                self.archive.writestr(part.partname.lstrip("/"), part.blob)
+                if part.rels:
+                    self.archive.writestr(part.partname.rels_uri.lstrip("/"), part.rels.xml)
+
+    def write(self, xml):
+        self.body.write(xml.encode("utf-8"))
+
+    def add_toc(self, toc_entries):
+        self.write('<w:p><w:pPr><w:jc w:val="center"/></w:pPr>'
+                   '<w:r><w:rPr><w:b/><w:sz w:val="28"/></w:rPr><w:t>Table of Contents</w:t></w:r></w:p><w:p/>')
+        for toc_entry in toc_entries:
+            self.add_link(toc_entry["title"], "w:anchor", toc_entry["anchor"])
+
+    def add_volume_index(self, volumes):
+        self.write('<w:p><w:r><w:rPr><w:b/><w:sz w:val="28"/></w:rPr><w:t>Volumes</w:t></w:r></w:p>')
+        for volume in volumes:
+            if volume["target"] is None:
+                self.write(f'<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{escape(volume["title"])}'
+                           '</w:t></w:r></w:p>')
+            else:
+                self.links += 1
+                rel_id = f"rIdLink{self.links}"
+                self.rels.write(f'<Relationship Id="{rel_id}" Type="{HYPERLINK_RELTYPE}" '
+                                f'Target={quoteattr(volume["target"])} TargetMode="External"/>'.encode())
+                self.add_link(volume["title"], "r:id", rel_id)
+
+    def add_link(self, title, attribute, value):
+        self.write(f'<w:p><w:hyperlink {attribute}={quoteattr(value)}><w:r><w:rPr>'
+                   '<w:rStyle w:val="Hyperlink"/><w:color w:val="0000FF" w:themeColor="hyperlink"/>'
+                   f'</w:rPr><w:t xml:space="preserve">{escape(title)}</w:t></w:r></w:hyperlink></w:p>')
+
+    def add_heading(self, title, bookmark_id, anchor):
+        self.write(f'<w:p><w:pPr><w:pStyle w:val="Heading1"/><w:pageBreakBefore/></w:pPr>'
+                   f'<w:bookmarkStart w:id="{bookmark_id}" w:name={quoteattr(anchor)}/>'
+                   f'<w:r><w:t xml:space="preserve">{escape(title)}</w:t></w:r></w:p>')
+
+    def end_bookmark(self, bookmark_id):
+        self.write(f'<w:bookmarkEnd w:id="{bookmark_id}"/>')
+
+    def add_media(self, data, ext):
+        # Store the image in the archive now and return its relationship id.
+        # JPEG is stored as-is; MuPDF's PNGs still deflate to about half.
+        # An image already in the archive is not written again.
+        digest = hashlib.sha1(data).digest()
+        if digest in self.media:
+            return self.media[digest]
+        self.images += 1
+        name = f"image{self.images}.{ext}"
+        compress = zipfile.ZIP_STORED if ext in ("jpeg", "jpg") else zipfile.ZIP_DEFLATED
+        self.archive.writestr("word/media/" + name, data, compress_type=compress)
+        self.media_types.add(ext)
+        rel_id = f"rIdImg{self.images}"
+        self.rels.write(f'<Relationship Id="{rel_id}" Type="{IMAGE_RELTYPE}" Target="media/{name}"/>'.encode())
+        self.media[digest] = rel_id
+        return rel_id
 
-    doc.save(output_word)
+    def add_picture(self, data, ext, width, height, page_break=False):
+        rel_id = self.add_media(data, ext)
+        self.shapes += 1
+        shape_id = self.shapes
+        self.write(
+            '<w:p>' + PICTURE_SPACING_XML + '<w:r>' + ('<w:br w:type="page"/>' if page_break else '') +
+            f'<w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0"><wp:extent cx="{width}" cy="{height}"/>'
+            f'<wp:docPr id="{shape_id}" name="Picture {shape_id}"/><wp:cNvGraphicFramePr>'
+            '<a:graphicFrameLocks xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" noChangeAspect="1"/>'
+            '</wp:cNvGraphicFramePr><a:graphic xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+            '<a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            '<pic:pic xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:nvPicPr><pic:cNvPr id="{shape_id}" name="image{shape_id}.{ext}"/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{width}" cy="{height}"/></a:xfrm>'
+            '<a:prstGeom prst="rect"/></pic:spPr></pic:pic></a:graphicData></a:graphic></wp:inline>'
+            '</w:drawing></w:r></w:p>')
+
+    def add_text(self, runs, page_break_before=False):
+        xml = ['<w:p>']
+        if page_break_before:
+            xml.append('<w:pPr><w:pageBreakBefore/></w:pPr>')
+        for text, size, bold, italic in runs:
+            xml.append('<w:r><w:rPr>' + ('<w:b/>' if bold else '') + ('<w:i/>' if italic else '') +
+                       f'<w:sz w:val="{int(size * 2)}"/></w:rPr><w:t xml:space="preserve">{escape(text)}</w:t></w:r>')
+        xml.append('</w:p>')
+        self.write(''.join(xml))
+
+    def close(self):
+        with self.archive.open("word/document.xml", "w", force_zip64=True) as f:
+            f.write(self.document_head)
+            self.body.seek(0)
+            shutil.copyfileobj(self.body, f)
+            f.write(self.document_tail)
+        with self.archive.open("word/_rels/document.xml.rels", "w") as f:
+            f.write(self.rels_head)
+            self.rels.seek(0)
+            shutil.copyfileobj(self.rels, f)
+            f.write(b"</Relationships>")
+        self.archive.writestr("[Content_Types].xml", self.content_types_xml())
+        self.archive.close()
+        self.body.close()
+        self.rels.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.archive.close()
+        self.body.close()
+        self.rels.close()
+        with contextlib.suppress(OSError):
+            os.remove(self.tmp_path)
+
+    def content_types_xml(self):
+        xml = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+               '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+               '<Default Extension="xml" ContentType="application/xml"/>']
+        for ext in sorted(self.media_types):
+            xml.append(f'<Default Extension="{ext}" ContentType="{IMAGE_CONTENT_TYPES[ext]}"/>')
+        for partname, content_type in self.content_types.items():
+            xml.append(f'<Override PartName="{partname}" ContentType="{content_type}"/>')
+        xml.append('</Types>')
+        return ''.join(xml)
+
+def as_writer(doc):
+    # The add_* helpers also accept a plain python-docx Document
+    return doc if isinstance(doc, (DocxWriter, StreamingDocxWriter)) else DocxWriter(document=doc)
+
+def add_images_to_doc(images, doc, flow=None, metrics=None):
+    writer = as_writer(doc)
+    flow = flow or PageFlow(writer.section)
+    for image in images:
+        if isinstance(image, EncodedPage):
+            data, ext = image.data, image.ext  # already encoded by the render stage
+            px_width, px_height = image.width, image.height
+        else:
+            image_stream = io.BytesIO()
+            image.save(image_stream, format='PNG')
+            data, ext = image_stream.getvalue(), "png"
+            px_width, px_height = image.size
+
+        # One paragraph per page image
+        width, height, needs_break = flow.place_image(px_width, px_height)
+        started = time.perf_counter()
+        writer.add_picture(data, ext, width, height, needs_break)
+        if metrics:
+            metrics.add_page(image if isinstance(image, EncodedPage) else None, time.perf_counter() - started,
+                             len(data))
+
+MODES = ("image", "text")
+XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+BOLD_FLAG, ITALIC_FLAG = 16, 2  # span flags from get_text("dict")
+
+def page_has_text(page):
+    return bool(page.get_text("text").strip())
+
+def text_runs(block):
+    # Merge the block's spans into (text, size, bold, italic) runs, one run per
+    # style change; lines are joined with a space unless they end in a hyphen
+    runs = []
+    for line in block["lines"]:
+        if runs and not runs[-1][0].endswith(("-", " ")):
+            runs[-1][0] += " "
+        for span in line["spans"]:
+            text = XML_INVALID.sub("", span["text"])
+            if not text:
+                continue
+            style = (round(span["size"] * 2) / 2,
+                     bool(span["flags"] & BOLD_FLAG) or "bold" in span["font"].lower(),
+                     bool(span["flags"] & ITALIC_FLAG))
+            if runs and tuple(runs[-1][1:]) == style:
+                runs[-1][0] += text
+            else:
+                runs.append([text, *style])
+    return runs if any(run[0].strip() for run in runs) else []
+
+def inline_image(block):
+    # Embedded image bytes and format, in a format Word can display; others
+    # (JPX, JBIG2, CMYK JPEG...) are converted to PNG
+    data, ext = block["image"], block["ext"].lower()
+    if ext in WORD_IMAGE_FORMATS and not (ext in ("jpeg", "jpg") and block.get("colorspace") == 4):
+        return data, ext
+    pix = fitz.Pixmap(data)
+    if pix.colorspace and pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix.tobytes("png"), "png"
+
+def add_text_page(page, doc, flow):
+    # Real paragraphs from the page's text layer, with embedded images inline
+    # at their size on the page (scaled down to fit the text area)
+    writer = as_writer(doc)
+    needs_break = flow.place_text_page()
+    for block in page.get_text("dict", sort=True)["blocks"]:
+        if block["type"] == 1:
+            x0, y0, x1, y1 = block["bbox"]
+            if x1 - x0 < 1 or y1 - y0 < 1:
+                continue
+            width, height = Pt(x1 - x0), Pt(y1 - y0)
+            scale = min(1.0, flow.width / width, (flow.height - PARAGRAPH_SPACING) / height)
+            data, ext = inline_image(block)
+            writer.add_picture(data, ext, int(width * scale), int(height * scale), needs_break)
+        else:
+            runs = text_runs(block)
+            if not runs:
+                continue
+            writer.add_text(runs, needs_break)
+        needs_break = False
+
+def add_pdf_pages(pdf_path, doc, flow, options=RenderOptions(), page_ranges=None, metrics=None):
+    # Text mode: pages with a text layer become paragraphs; only pages without
+    # one (scans) are rasterized
+    with fitz.open(pdf_path) as pdf:
+        for start, stop in page_ranges or [(0, len(pdf))]:
+            for page_num in range(start, stop):
+                page = pdf.load_page(page_num)
+                if page_has_text(page):
+                    started = time.perf_counter()
+                    add_text_page(page, doc, flow)
+                    if metrics:
+                        metrics.add_page(None, time.perf_counter() - started, 0, source="text")
+                else:
+                    add_images_to_doc([render_page(page, options)], doc, flow, metrics)
+
+def add_toc(doc, toc_entries):
+    as_writer(doc).add_toc(toc_entries)
+
+class MergeMetrics:
+    """Per-stage timings and per-file/per-page figures for one output document.
+
+    Stages are open (reading and hashing inputs in the main process), render
+    and encode (summed over whichever processes did them, so with a pool they
+    can exceed the wall time), insert (adding pages to the document) and save.
+    With progress on, a status line is refreshed on stderr as pages arrive:
+    redrawn in place when ``live`` (default: stderr is a terminal), otherwise
+    printed as one line per update.
+    """
+
+    stages = ("open", "render", "encode", "insert", "save")
+    progress_interval = 0.5  # seconds between status lines
+
+    def __init__(self, label, total_pages=0, progress=False, live=None):
+        self.label = label
+        self.total_pages = total_pages
+        self.progress = progress
+        self.live = sys.stderr.isatty() if live is None else live
+        self.seconds = dict.fromkeys(self.stages, 0.0)
+        self.files = []
+        self.pages = []
+        self.page_numbers = iter(())
+        self.encoded_bytes = 0
+        self.output_bytes = 0
+        self.started = time.perf_counter()
+        self.shown = 0.0
+        self.shown_pages = None  # page count on the last status line
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def start_file(self, part):
+        self.files.append(dict(file=part.pdf_file, title=part.title, pages=0, bytes=0,
+                               render_seconds=0.0, encode_seconds=0.0, insert_seconds=0.0))
+        self.page_numbers = (page_num + 1 for start, stop in part.ranges for page_num in range(start, stop))
+
+    def add_page(self, page, insert_seconds, size, source=None):
+        record = self.files[-1]
+        render_seconds = page.render_seconds if page else 0.0
+        encode_seconds = page.encode_seconds if page else 0.0
+        self.pages.append(dict(file=len(self.files) - 1, page=next(self.page_numbers, None),
+                               source=source or (page.source if page else "image"), bytes=size,
+                               render_seconds=render_seconds, encode_seconds=encode_seconds,
+                               insert_seconds=insert_seconds))
+        record["pages"] += 1
+        record["bytes"] += size
+        record["render_seconds"] += render_seconds
+        record["encode_seconds"] += encode_seconds
+        record["insert_seconds"] += insert_seconds
+        self.seconds["render"] += render_seconds
+        self.seconds["encode"] += encode_seconds
+        self.seconds["insert"] += insert_seconds
+        self.encoded_bytes += size
+        if self.progress and time.perf_counter() - self.shown >= self.progress_interval:
+            self.show()
+
+    def show(self, end="\r"):
+        self.shown = time.perf_counter()
+        elapsed = self.shown - self.started
+        done = self.shown_pages = len(self.pages)
+        name = os.path.basename(self.files[-1]["file"]) if self.files else ""
+        print(f"{os.path.basename(self.label)}: {done}/{self.total_pages} pages, "
+              f"{done / elapsed if elapsed else 0:.1f} pages/s, {self.encoded_bytes / 1024 ** 2:.1f} MB, "
+              f"file {len(self.files)} {name}" + ("\033[K" if self.live else ""),
+              end=end if self.live else "\n", file=sys.stderr, flush=True)
+
+    def finish(self, output_word):
+        self.output_bytes = os.path.getsize(output_word)
+        # A log already has the last line unless pages came in since; a
+        # terminal needs the redrawn line ended either way
+        if self.progress and (self.live or self.shown_pages != len(self.pages)):
+            self.show(end="\n")
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        return dict(output=self.label, pages=len(self.pages), wall_seconds=wall,
+                    pages_per_second=len(self.pages) / wall if wall else 0.0,
+                    encoded_bytes=self.encoded_bytes, output_bytes=self.output_bytes,
+                    stages=self.seconds, files=self.files, page_details=self.pages)
+
+def log_encoding(pages, label):
+    # Pass-through that reports each page's codec, size and encoding time
+    for page_num, page in enumerate(pages, start=1):
+        print(f"{label} page {page_num}: {page.ext.upper()} {len(page.data) / 1024:.1f} KiB "
+              f"in {page.encode_seconds * 1000:.1f} ms", file=sys.stderr)
+        yield page
+
+# One document (or a slice of one, when a volume split divides it) under its
+# own heading and bookmark; ranges are (start, stop) page ranges
+Part = namedtuple("Part", "pdf_file number title ranges pdf_hash")
+
+SIZE_SAMPLES = 3       # pages rendered per file to estimate its encoded size
+PAGE_XML_BYTES = 2048  # document.xml and relationship overhead per page
+
+def merge_pdfs_to_word(pdf_files, output_word, workers=None, pipeline_depth=16, options=RenderOptions(),
+                       verbose=False, mode="image", writer="docx", max_pages=None, max_bytes=None,
+                       progress=False, report=None):
+    # mode "image" pastes every page as a picture; "text" emits editable
+    # paragraphs and rasterizes only pages without a text layer.
+    # writer "docx" builds the document with python-docx; "stream" writes
+    # the file as pages arrive, for merges too large to hold in memory.
+    # max_pages/max_bytes split the output into volumes (name-vol1.docx,
+    # ...) of at most that many pages or (estimated) bytes each.
+    # progress shows a live status line on stderr; report is a path to
+    # write per-stage, per-file and per-page metrics to as JSON.
+    # Returns the paths written.
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+    if writer not in WRITERS:
+        raise ValueError(f"writer must be one of {WRITERS}, not {writer!r}")
+
+    # Render at the size the page flow will display images at; both writers
+    # use the python-docx default template's page setup
+    flow = PageFlow(Document().sections[-1])
+    options = options._replace(max_width=flow.width / EMU_PER_INCH,
+                               max_height=(flow.height - PARAGRAPH_SPACING) / EMU_PER_INCH)
+
+    # Page counts let the pool split every file into page ranges up front;
+    # each file is opened only to count its pages and closed again, then
+    # reopened when its turn to render comes. Content hashes key the render
+    # cache; computed once here, not per task
+    started = time.perf_counter()
+    parts, page_counts, opened = [], [], []
+    for number, source in enumerate(pdf_files, start=1):
+        file_started = time.perf_counter()
+        pdf_file, spec = split_source(source)
+        with fitz.open(pdf_file) as pdf:
+            page_counts.append(len(pdf))
+        ranges = parse_page_spec(spec, page_counts[-1]) if spec else [(0, page_counts[-1])]
+        pdf_hash = file_digest(pdf_file) if options.cache_dir else None
+        parts.append(Part(pdf_file, number, part_title(number, pdf_file, ranges if spec else None), ranges,
+                          pdf_hash))
+        opened.append(dict(file=pdf_file, pages=page_counts[-1], selected=sum(b - a for a, b in ranges),
+                           bytes=os.path.getsize(pdf_file), open_seconds=time.perf_counter() - file_started))
+
+    volumes = [parts]
+    if max_pages or max_bytes:
+        page_bytes = [estimate_page_bytes(part.pdf_file, count, options, mode, part.ranges) if max_bytes else 0
+                      for part, count in zip(parts, page_counts)]
+        volumes = plan_volumes(parts, page_bytes, max_pages, max_bytes)
+    if len(volumes) == 1:
+        reports = [write_volume(output_word, parts, None, workers, pipeline_depth, options, verbose, mode, writer,
+                                progress)]
+        write_report(report, started, opened, reports)
+        return [output_word]
+
+    # Every volume carries an index of all volumes, linking to the others
+    root, ext = os.path.splitext(output_word)
+    paths = [f"{root}-vol{n}{ext}" for n in range(1, len(volumes) + 1)]
+    entries = []
+    for n, (path, volume) in enumerate(zip(paths, volumes), start=1):
+        first, last = volume[0].number, volume[-1].number
+        documents = f"Document {first}" if first == last else f"Documents {first}-{last}"
+        entries.append(f"Volume {n}: {os.path.basename(path)} ({documents})")
+    jobs = [(path, volume,
+             [{'title': entry, 'target': None if other == path else os.path.basename(other)}
+              for entry, other in zip(entries, paths)],
+             1, pipeline_depth, options, verbose, mode, writer, progress)
+            for path, volume in zip(paths, volumes)]
+
+    # Volumes are independent: assemble them side by side, each rendering
+    # serially. Their status lines share stderr, so each prints whole lines
+    # (prefixed with its volume's name) instead of redrawing one in place
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        jobs = [job + (False,) for job in jobs]
+    if workers == 1:
+        reports = [write_volume(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = [future.result() for future in [pool.submit(write_volume, *job) for job in jobs]]
+    write_report(report, started, opened, reports)
+    return paths
+
+def write_report(path, started, opened, reports):
+    # Whole-merge totals over the volume reports, written as JSON when a path is given
+    if not path:
+        return
+    wall = time.perf_counter() - started
+    pages = sum(volume["pages"] for volume in reports)
+    stages = {stage: sum(volume["stages"][stage] for volume in reports) for stage in MergeMetrics.stages}
+    stages["open"] += sum(record["open_seconds"] for record in opened)
+    summary = dict(wall_seconds=wall, pages=pages, pages_per_second=pages / wall if wall else 0.0,
+                   input_bytes=sum(record["bytes"] for record in opened),
+                   encoded_bytes=sum(volume["encoded_bytes"] for volume in reports),
+                   output_bytes=sum(volume["output_bytes"] for volume in reports),
+                   stages=stages, inputs=opened, volumes=reports)
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+def part_title(number, pdf_file, ranges=None):
+    title = f"Document {number}: {pdf_file.split('/')[-1]}"
+    return f"{title} (pages {format_ranges(ranges)})" if ranges else title
+
+def slice_ranges(ranges, skip, take):
+    # Pages skip .. skip + take of the concatenated ranges, as ranges
+    sliced = []
+    for start, stop in ranges:
+        if skip >= stop - start:
+            skip -= stop - start
+            continue
+        begin = start + skip
+        end = min(stop, begin + take)
+        sliced.append((begin, end))
+        take -= end - begin
+        skip = 0
+        if not take:
+            break
+    return sliced
+
+def estimate_page_bytes(pdf_file, page_count, options, mode, ranges=None):
+    # Average encoded size of a few evenly spaced selected pages; the samples
+    # land in the page memo and render cache, so they are not wasted
+    ranges = ranges or [(0, page_count)]
+    selected = sum(stop - start for start, stop in ranges)
+    if mode == "text" or not selected:
+        return os.path.getsize(pdf_file) / max(page_count, 1) + PAGE_XML_BYTES
+    samples = sorted({slice_ranges(ranges, selected * i // SIZE_SAMPLES, 1)[0][0] for i in range(SIZE_SAMPLES)})
+    total = 0
+    with fitz.open(pdf_file) as pdf:
+        for page_num in samples:
+            page = render_page(pdf.load_page(page_num), options)
+            # Everything but JPEG is deflated again in the .docx zip
+            total += len(page.data) if page.ext in ("jpeg", "jpg") else len(zlib.compress(page.data, 1))
+    return total / len(samples) + PAGE_XML_BYTES
+
+def plan_volumes(parts, page_bytes, max_pages=None, max_bytes=None):
+    # Greedy split into volumes of at most max_pages pages and max_bytes
+    # estimated bytes. A document that fits in a volume of its own is never
+    # split; a larger one is divided into page slices.
+    volumes = [[]]
+    used_pages = used_bytes = 0
+    for part, per_page in zip(parts, page_bytes):
+        total = sum(stop - start for start, stop in part.ranges)
+        capacity = min(max_pages or total, int(max_bytes // per_page) if max_bytes and per_page else total)
+        capacity = max(1, capacity)
+        done = 0
+        while done < total:
+            room = min(max_pages - used_pages if max_pages else total,
+                       int((max_bytes - used_bytes) // per_page) if max_bytes and per_page else total)
+            remaining = total - done
+            if volumes[-1] and (room <= 0 or (remaining > room and remaining <= capacity)):
+                volumes.append([])
+                used_pages = used_bytes = 0
+                continue
+            take = min(remaining, max(room, 1))
+            if take < total:
+                ranges = slice_ranges(part.ranges, done, take)
+                part_slice = part._replace(title=part_title(part.number, part.pdf_file, ranges), ranges=ranges)
+            else:
+                part_slice = part
+            volumes[-1].append(part_slice)
+            used_pages += take
+            used_bytes += take * per_page
+            done += take
+    return [volume for volume in volumes if volume]
+
+def write_volume(output_word, parts, index, workers, pipeline_depth, options, verbose, mode, writer,
+                 progress=False, live=None):
+    # Returns the volume's MergeMetrics report
+    total_pages = sum(stop - start for part in parts for start, stop in part.ranges)
+    metrics = MergeMetrics(output_word, total_pages, progress, live)
+    doc = StreamingDocxWriter(output_word) if writer == "stream" else DocxWriter(output_word)
+    try:
+        write_merged(doc, parts, index, workers, pipeline_depth, options, verbose, mode, metrics)
+    except BaseException:
+        doc.abort()
+        raise
+    with metrics.stage("save"):
+        doc.close()
+    if options.cache_dir:
+        # Trim the shared cache by its real size on disk, whoever wrote to it
+        RenderCache(options.cache_dir, options.cache_max_bytes).evict()
+    metrics.finish(output_word)
+    return metrics.report()
+
+def write_merged(doc, parts, index, workers, pipeline_depth, options, verbose, mode, metrics=None):
+    flow = PageFlow(doc.section)
+
+    # Pages flow render -> encode -> insert one at a time and are released
+    # right after insertion
+    if mode == "text":
+        pages = None
+    elif workers == 1:
+        pages = (page for part in parts for start, stop in part.ranges
+                 for page in encode_pages(part.pdf_file, start, stop, options, part.pdf_hash))
+    else:
+        pages = render_pdfs([part.pdf_file for part in parts], None, options, workers, pipeline_depth,
+                            pdf_hashes=[part.pdf_hash for part in parts],
+                            page_ranges=[part.ranges for part in parts])
+
+    # Add TOC at the beginning; it gets a page of its own
+    toc_entries = [{'title': part.title, 'anchor': f"bookmark_{idx}"} for idx, part in enumerate(parts)]
+    doc.add_toc(toc_entries)
+    if index:
+        doc.add_volume_index(index)
+    flow.used = flow.height
+
+    for idx, (part, toc_entry) in enumerate(zip(parts, toc_entries)):
+        # Create bookmarks and add images; every document starts on a new page
+        doc.add_heading(part.title, idx, toc_entry['anchor'])
+        flow.new_page()
+        flow.add_heading()
+        if metrics:
+            metrics.start_file(part)
+
+        # Add the bookmark end after the pages
+        if mode == "text":
+            add_pdf_pages(part.pdf_file, doc, flow, options, part.ranges, metrics)
+        else:
+            images = islice(pages, sum(stop - start for start, stop in part.ranges))
+            if verbose:
+                images = log_encoding(images, os.path.basename(part.pdf_file))
+            add_images_to_doc(images, doc, flow, metrics)
+
+        doc.end_bookmark(idx)
 
 def select_pdf_files():
+    from tkinter import Tk, filedialog  # only the GUI needs Tk
     root = Tk()
     root.withdraw()  # Hide the main window
     pdf_files = filedialog.askopenfilenames(
@@ -108,6 +1112,7 @@ def select_pdf_files():
     return root.tk.splitlist(pdf_files)
 
 def select_output_file():
+    from tkinter import Tk, filedialog
     root = Tk()
     root.withdraw()  # Hide the main window
     output_file = filedialog.asksaveasfilename(
@@ -117,8 +1122,198 @@ def select_output_file():
     )
     return output_file
 
-# Main script execution
-if __name__ == "__main__":
+ORDERS = ("given", "name", "mtime", "size")
+# Settings a job manifest (or the command line) may give; inputs and output are required
+JOB_KEYS = ("inputs", "output", "order", "reverse", "recursive", "mode", "codec", "quality", "dpi",
+            "preset", "color", "passthrough", "cache_dir", "workers", "verbose", "writer", "max_pages", "max_mb",
+            "progress", "report")
+# Watch mode only picks up files with this suffix, so JSON reports and other
+# files that jobs write into the folder are never mistaken for jobs
+MANIFEST_SUFFIX = ".job.json"
+
+def natural_key(path):
+    # "file2.pdf" sorts before "file10.pdf"
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", path)]
+
+def collect_pdf_files(sources, order="given", reverse=False, recursive=False):
+    # Expand files, directories and glob patterns into a list of PDF paths.
+    # "given" keeps the argument order (each directory or glob sorted by
+    # name); the other orders sort the whole list. A file a directory or glob
+    # matches again is dropped, but files named explicitly are kept every time
+    # they are given (e.g. a cover sheet repeated between documents).
+    # A page-range suffix ("scans/*.pdf:1") applies to every file matched.
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {ORDERS}, not {order!r}")
+    pdf_files, seen = [], set()
+    for source in sources:
+        source, spec = split_source(source)
+        explicit = False
+        if os.path.isdir(source):
+            pattern = os.path.join(source, "**", "*") if recursive else os.path.join(source, "*")
+            matches = [path for path in glob.glob(pattern, recursive=recursive)
+                       if path.lower().endswith(".pdf") and os.path.isfile(path)]
+        elif glob.has_magic(source):
+            matches = [path for path in glob.glob(source, recursive=True) if os.path.isfile(path)]
+        elif os.path.isfile(source):
+            matches = [source]
+            explicit = True
+        else:
+            raise ValueError(f"no such file or directory: {source}")
+        if not matches:
+            raise ValueError(f"no PDF files match {source}")
+        for path in sorted(matches, key=natural_key):
+            key = (os.path.normpath(path), spec)
+            if explicit or key not in seen:
+                seen.add(key)
+                pdf_files.append(f"{path}:{spec}" if spec else path)
+    if order == "name":
+        pdf_files.sort(key=lambda source: natural_key(os.path.basename(source)))
+    elif order == "mtime":
+        pdf_files.sort(key=lambda source: os.path.getmtime(split_source(source)[0]))
+    elif order == "size":
+        pdf_files.sort(key=lambda source: os.path.getsize(split_source(source)[0]))
+    if reverse:
+        pdf_files.reverse()
+    return pdf_files
+
+def run_job(job, base_dir="."):
+    # One merge described by a dict of JOB_KEYS; relative paths are taken
+    # from base_dir (the manifest's folder in watch mode)
+    unknown = set(job) - set(JOB_KEYS)
+    if unknown:
+        raise ValueError(f"unknown job settings: {', '.join(sorted(unknown))}")
+    if not job.get("inputs") or not job.get("output"):
+        raise ValueError("a job needs inputs and an output")
+    inputs = [job["inputs"]] if isinstance(job["inputs"], str) else job["inputs"]
+    pdf_files = collect_pdf_files([os.path.join(base_dir, source) for source in inputs],
+                                  job.get("order", "given"), job.get("reverse", False), job.get("recursive", False))
+    output_word = os.path.join(base_dir, job["output"])
+    if os.path.dirname(output_word):
+        os.makedirs(os.path.dirname(output_word), exist_ok=True)
+
+    defaults = RenderOptions()
+    preset = job.get("preset")
+    if preset is not None and preset not in QUALITY_PRESETS:
+        raise ValueError(f"preset must be one of {tuple(QUALITY_PRESETS)}, not {preset!r}")
+    options = RenderOptions(codec=job.get("codec", defaults.codec), quality=job.get("quality", defaults.quality),
+                            dpi=QUALITY_PRESETS[preset] if preset else job.get("dpi", defaults.dpi),
+                            color=job.get("color", defaults.color),
+                            cache_dir=job.get("cache_dir"), passthrough=job.get("passthrough", True))
+    if options.codec not in CODECS or options.color not in COLOR_MODES:
+        raise ValueError(f"codec must be one of {CODECS} and color one of {COLOR_MODES}")
+    max_bytes = job["max_mb"] * 1024 ** 2 if job.get("max_mb") else None
+    report = os.path.join(base_dir, job["report"]) if job.get("report") else None
+    output_words = merge_pdfs_to_word(pdf_files, output_word, workers=job.get("workers"), options=options,
+                                      verbose=job.get("verbose", False), mode=job.get("mode", "image"),
+                                      writer=job.get("writer", "docx"), max_pages=job.get("max_pages"),
+                                      max_bytes=max_bytes, progress=job.get("progress", False),
+                                      report=report)
+    return ", ".join(output_words), len(pdf_files)
+
+def run_manifest(path, workers=1):
+    # Runs in a watch-mode worker process. workers is the render pool size
+    # for jobs that don't set one, so concurrent jobs share the CPUs
+    with open(path) as f:
+        job = json.load(f)
+    if isinstance(job, dict):
+        job.setdefault("workers", workers)
+    return run_job(job, os.path.dirname(path))
+
+def watch_folder(directory, jobs=None, interval=2.0, once=False):
+    # Process every *.job.json manifest dropped into directory. A manifest is
+    # claimed by renaming it to .working (so several watchers can share a
+    # folder) and renamed to .done or .failed when its merge finishes.
+    # Manifests should be written elsewhere and moved in, so they are never
+    # read half-written.
+    jobs = jobs or os.cpu_count() or 1
+    workers = max(1, (os.cpu_count() or 1) // jobs)
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            for name in sorted(os.listdir(directory), key=natural_key):
+                if not name.endswith(MANIFEST_SUFFIX):
+                    continue
+                manifest = os.path.join(directory, name)
+                claimed = manifest + ".working"
+                try:
+                    os.rename(manifest, claimed)
+                except OSError:
+                    continue  # taken by another watcher
+                running[pool.submit(run_manifest, claimed, workers)] = manifest
+                print(f"Started {name}", file=sys.stderr)
+            if not running:
+                if once:
+                    return
+                time.sleep(interval)
+                continue
+            finished, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+            for future in finished:
+                manifest = running.pop(future)
+                try:
+                    output_word, count = future.result()
+                except Exception as error:
+                    os.replace(manifest + ".working", manifest + ".failed")
+                    print(f"Failed {os.path.basename(manifest)}: {error}", file=sys.stderr)
+                else:
+                    os.replace(manifest + ".working", manifest + ".done")
+                    print(f"Finished {os.path.basename(manifest)}: merged {count} PDF files into {output_word}",
+                          file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Merge PDF files into one Word document. Run without arguments for the file dialogs.")
+    parser.add_argument("inputs", nargs="*",
+                        help="PDF files, directories or glob patterns, in order; add :1-3,10-20 to select pages")
+    parser.add_argument("-o", "--output", help="Word document to write")
+    parser.add_argument("--order", choices=ORDERS, default="given",
+                        help="given: argument order (default); name: natural file-name order; mtime; size")
+    parser.add_argument("--reverse", action="store_true", help="reverse the final order")
+    parser.add_argument("--recursive", action="store_true", help="include PDFs in subdirectories")
+    parser.add_argument("--mode", choices=MODES, default="image",
+                        help="image: one picture per page (default); text: editable paragraphs")
+    parser.add_argument("--writer", choices=WRITERS, default="docx",
+                        help="docx: build with python-docx (default); stream: write incrementally, constant memory")
+    parser.add_argument("--max-pages", type=int, help="split the output into volumes of at most this many pages")
+    parser.add_argument("--max-mb", type=float, help="split the output into volumes of about this many MB at most")
+    parser.add_argument("--codec", choices=CODECS, default="png", help="page image codec")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality")
+    parser.add_argument("--dpi", type=int, default=150, help="page image DPI at the displayed size")
+    parser.add_argument("--preset", choices=tuple(QUALITY_PRESETS), help="DPI preset; overrides --dpi")
+    parser.add_argument("--color", choices=COLOR_MODES, default="color", help="page image colour mode")
+    parser.add_argument("--no-passthrough", dest="passthrough", action="store_false",
+                        help="always re-render scanned pages")
+    parser.add_argument("--cache-dir", help="reuse rendered pages across runs from this directory")
+    parser.add_argument("--workers", type=int, help="render processes (default: CPU count)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="report every encoded page")
+    parser.add_argument("--progress", action="store_true", help="show live progress on stderr")
+    parser.add_argument("--report", metavar="FILE", help="write per-stage, per-file and per-page metrics as JSON")
+    parser.add_argument("--watch", metavar="DIR", help="process JSON job manifests dropped into DIR")
+    parser.add_argument("--jobs", type=int, help="merges run at once in watch mode (default: CPU count)")
+    parser.add_argument("--interval", type=float, default=2.0, help="watch-folder poll interval in seconds")
+    parser.add_argument("--once", action="store_true", help="exit once the watch folder is empty")
+    return parser, parser.parse_args(argv)
+
+def main(argv=None):
+    parser, args = parse_args(argv)
+    if args.watch:
+        try:
+            watch_folder(args.watch, args.jobs, args.interval, args.once)
+        except KeyboardInterrupt:
+            pass
+        return
+    if not args.inputs:
+        gui()
+        return
+    if not args.output:
+        parser.error("--output is required with input files")
+    job = {key: value for key, value in vars(args).items() if key in JOB_KEYS}
+    try:
+        output_word, count = run_job(job)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Merged {count} PDF files into {output_word}")
+
+def gui():
     pdf_files = select_pdf_files()
     if not pdf_files:
         print("No PDF files selected. Exiting...")
@@ -129,3 +1324,7 @@ if __name__ == "__main__":
         else:
             merge_pdfs_to_word(pdf_files, output_word)
             print(f"Merged document saved as {output_word}")
+
+# Main script execution
+if __name__ == "__main__":
+    main()
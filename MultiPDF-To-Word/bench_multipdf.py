@@ -0,0 +1,245 @@
+"""
+Performance benchmark for MultiPDF-To-Word.
+
+Generates synthetic PDFs locally with PyMuPDF: text-only pages, image-heavy
+pages (several photos per page) and scanned-style pages (one full-page JPEG
+each). Page counts range from 1 to 2000. It then times the pipeline
+functions on them:
+
+    pdf_to_images        render every page to a PIL image
+    add_images_to_doc    insert pre-encoded pages into a python-docx Document
+    merge_pdfs_to_word   the whole merge, end to end
+
+Every case runs in a fresh child process, so each case's peak RSS is its
+own. Wall time, peak RSS of the case process and of its largest render
+worker (where the platform reports them) and output size are recorded. Results can be saved as JSON and compared against a previous
+run, failing on regressions. No GUI or network access is needed.
+
+Usage:
+    python bench_multipdf.py --output bench.json
+    python bench_multipdf.py --pages 1,100 --kinds text,scan --baseline bench.json
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw, ImageFilter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Imported under its own name so worker processes can unpickle its functions
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+multipdf = importlib.import_module("MultiPDF-To-Word")
+
+KINDS = ("text", "image", "scan")
+TARGETS = ("pdf_to_images", "add_images_to_doc", "merge_pdfs_to_word")
+WORDS = ("merge", "document", "page", "report", "section", "figure", "table", "summary", "review", "appendix",
+         "contract", "invoice", "schedule", "exhibit", "record", "policy", "notice", "statement", "form", "index")
+
+
+# === INPUT GENERATION ===
+def lorem(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def add_text_page(page, rng, page_num):
+    page.insert_text((72, 72), f"Section {page_num}", fontsize=18, fontname="hebo")
+    body = "\n\n".join(lorem(rng, rng.randint(40, 80)) for _ in range(6))
+    page.insert_textbox(fitz.Rect(72, 100, page.rect.width - 72, page.rect.height - 72), body, fontsize=10)
+
+def photo(rng, width=480, height=320):
+    # Random blurred shapes: compresses like a photo, unique per call
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        box = (x, y, x + rng.randint(10, width // 2), y + rng.randint(10, height // 2))
+        draw.ellipse(box, fill=tuple(rng.randrange(256) for _ in range(3)))
+    stream = io.BytesIO()
+    image.filter(ImageFilter.GaussianBlur(3)).save(stream, format="JPEG", quality=80)
+    return stream.getvalue()
+
+def generate_pdf(path, kind, pages, seed=0):
+    rng = random.Random(f"{kind}-{seed}")
+    doc = fitz.open()
+    scratch = fitz.open()
+    for page_num in range(1, pages + 1):
+        if kind == "scan":
+            # A text page rasterized to a grayscale JPEG, the way a scanner produces it
+            source = scratch.new_page(width=612, height=792)
+            add_text_page(source, rng, page_num)
+            pix = source.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+            page = doc.new_page(width=612, height=792)
+            page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=75))
+            scratch.delete_page(0)
+        else:
+            page = doc.new_page()
+            add_text_page(page, rng, page_num)
+            if kind == "image":
+                for slot in range(3):
+                    top = 120 + slot * 220
+                    page.insert_image(fitz.Rect(100, top, 500, top + 200), stream=photo(rng))
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def input_pdf(workdir, kind, pages):
+    # Generated once per (kind, page count) and reused by later runs
+    path = os.path.join(workdir, f"{kind}-{pages}.pdf")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        tmp_path = path + ".tmp"
+        generate_pdf(tmp_path, kind, pages)
+        os.replace(tmp_path, path)
+        print(f"generated {os.path.basename(path)} in {time.perf_counter() - started:.1f} s", flush=True)
+    return path
+
+
+# === MEASUREMENT (runs in a child process) ===
+def peak_rss_mb(who="self"):
+    # "children" is the largest finished child, i.e. the render pool workers
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if who == "children" else resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+def run_case(case):
+    pdf_path = case["pdf"]
+    output_bytes = 0
+    if case["target"] == "pdf_to_images":
+        started = time.perf_counter()
+        for image in multipdf.pdf_to_images(pdf_path):
+            output_bytes += image.width * image.height * 3
+        wall = time.perf_counter() - started
+    elif case["target"] == "add_images_to_doc":
+        # Pages are encoded up front so only insertion and save are timed
+        pages = list(multipdf.encode_pages(pdf_path))
+        doc = multipdf.Document()
+        started = time.perf_counter()
+        multipdf.add_images_to_doc(pages, doc)
+        stream = io.BytesIO()
+        doc.save(stream)
+        wall = time.perf_counter() - started
+        output_bytes = stream.tell()
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            output_word = os.path.join(tmp, "merged.docx")
+            started = time.perf_counter()
+            multipdf.merge_pdfs_to_word([pdf_path], output_word, workers=case["workers"], mode=case["mode"],
+                                        writer=case["writer"])
+            wall = time.perf_counter() - started
+            output_bytes = os.path.getsize(output_word)
+    # The render pool has shut down by now, so its workers count as children
+    return dict(wall_seconds=wall, peak_rss_mb=peak_rss_mb(), worker_peak_rss_mb=peak_rss_mb("children"),
+                output_bytes=output_bytes)
+
+def measure(case):
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(case)],
+                           capture_output=True, text=True)
+    if child.returncode:
+        raise RuntimeError(f"case {case} failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+# === REPORTING ===
+GATED = (("peak_rss_mb", "RSS"), ("worker_peak_rss_mb", "worker RSS"), ("output_bytes", "size"))
+
+def compare(results, baseline, threshold, min_seconds):
+    regressions = []
+    for key, case in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = case["wall_seconds"] / before["wall_seconds"] - 1.0
+        if change > threshold and case["wall_seconds"] >= min_seconds:
+            regressions.append((key, "time", change))
+        changes = [f"{change:+7.1%} time"]
+        for metric, label in GATED:
+            # Missing or zero (no platform support, no render workers) is not compared
+            if case.get(metric) and before.get(metric):
+                metric_change = case[metric] / before[metric] - 1.0
+                if metric_change > threshold:
+                    regressions.append((key, label, metric_change))
+                changes.append(f"{metric_change:+7.1%} {label}")
+        print(f"{key:44s} {case['wall_seconds']:9.3f} s  " + "  ".join(changes))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MultiPDF-To-Word pipeline on generated PDFs")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="comma-separated input kinds: text, image, scan")
+    parser.add_argument("--pages", default="1,10,100,2000", help="comma-separated page counts")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated functions to time")
+    parser.add_argument("--workers", type=int, help="render processes for merge_pdfs_to_word (default: CPU count)")
+    parser.add_argument("--mode", choices=multipdf.MODES, default="image", help="merge mode")
+    parser.add_argument("--writer", choices=multipdf.WRITERS, default="docx", help="merge output writer")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "multipdf-bench"),
+                        help="where generated PDFs are kept between runs")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fail when wall time, peak RSS or output size grows by more than this fraction "
+                             "(default 0.15)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="ignore time regressions on cases faster than this (timer noise)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(json.loads(args.child))))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    kinds = args.kinds.split(",")
+    page_counts = [int(p) for p in args.pages.split(",")]
+    targets = args.targets.split(",")
+    unknown = set(kinds) - set(KINDS) | set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown kinds or targets: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for kind in kinds:
+        for pages in page_counts:
+            pdf_path = input_pdf(args.workdir, kind, pages)
+            for target in targets:
+                key = f"{target}/{kind}/p{pages}"
+                case = measure(dict(target=target, pdf=pdf_path, workers=args.workers, mode=args.mode,
+                                    writer=args.writer))
+                case["pages_per_second"] = pages / case["wall_seconds"] if case["wall_seconds"] else 0.0
+                results[key] = case
+                rss = f"{case['peak_rss_mb']:7.1f} MB" if case["peak_rss_mb"] else "      n/a"
+                worker_rss = f"{case['worker_peak_rss_mb']:7.1f} MB" if case["worker_peak_rss_mb"] else "      n/a"
+                print(f"{key:44s} {case['wall_seconds']:9.3f} s  {case['pages_per_second']:8.1f} pages/s  "
+                      f"RSS {rss}  workers {worker_rss}  out {case['output_bytes'] / 1024 ** 2:8.2f} MB", flush=True)
+
+    if args.output:
+        report = dict(python=platform.python_version(), pymupdf=fitz.VersionBind, machine=platform.machine(),
+                      cpus=os.cpu_count(), mode=args.mode, writer=args.writer, workers=args.workers,
+                      results=results)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            for key, metric, change in regressions:
+                print(f"regression: {key} {metric} {change:+.1%}", file=sys.stderr)
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
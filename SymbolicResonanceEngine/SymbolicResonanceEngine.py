@@ -1,143 +1,859 @@
 import numpy as np
-import sounddevice as sd
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import sys
 import threading
 import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque, namedtuple
 from datetime import datetime
 
+# === AUDIO CONFIGURATION ===
+sample_rate = 44100
+binaural_offset = 0.05
+
+# === TIMELINE EVENTS & GLIDE SEGMENTS ===
+# An event is a transition stamped with the absolute sample it takes effect on;
+# `index` is its position in the pattern cycle and `generation` tells the
+# callback whether a pattern switch has made it stale.
+Event = namedtuple("Event", "sample freq amplitude mod_freq fade_time hold_duration pattern index generation")
+# A segment is the glide+hold state that an event starts; every output sample is
+# a pure function of its absolute index and the segment it falls in.
+Segment = namedtuple("Segment", "start from_freq target_freq step glide_len amplitude mod_freq")
+
 # === THEMATIC PATTERNS WITH SYMBOLIC CONFIG ===
-harmonic_patterns = {
-    "awakening": {
-        "frequencies": [111, 222, 369],
-        "config": dict(amplitude=0.369, mod_freq=3.0, fade_time=9.0, hold_duration=18.0)
-    },
-    "healing": {
-        "frequencies": [417, 432, 528],
-        "config": dict(amplitude=0.432, mod_freq=6.0, fade_time=12.96, hold_duration=43.2)
-    },
-    "power": {
-        "frequencies": [777, 888, 963],
-        "config": dict(amplitude=0.777, mod_freq=7.77, fade_time=14.4, hold_duration=28.8)
-    },
-    "return": {
-        "frequencies": [369, 528, 888],
-        "config": dict(amplitude=0.528, mod_freq=3.0, fade_time=10.0, hold_duration=21.0)
-    },
-    "master_33": {
-        "frequencies": [111, 528, 963],
-        "config": dict(amplitude=0.33, mod_freq=3.3, fade_time=11.0, hold_duration=33.0)
-    }
-}
+# Patterns are defined in patterns.json (or any .json/.toml file passed with
+# --patterns) and are validated and precompiled the first time they are needed.
+default_patterns_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.json")
+patterns_path = default_patterns_path
+harmonic_patterns = {}  # name -> Pattern, filled lazily by pattern_library()
+
+# A compiled pattern: the frequency array, its config, the hold length in
+# samples and one cycle of events stamped relative to the start of the cycle.
+Pattern = namedtuple("Pattern", "name frequencies config hold_samples cycle")
+config_keys = ("amplitude", "mod_freq", "fade_time", "hold_duration")
+
+def compile_pattern(name, spec, source="patterns"):
+    where = f"{source}: pattern '{name}'"
+    if not isinstance(spec, dict):
+        raise ValueError(f"{where}: expected a table with 'frequencies' and 'config'")
+    freqs = spec.get("frequencies")
+    if not isinstance(freqs, list) or not freqs:
+        raise ValueError(f"{where}: 'frequencies' must be a non-empty list")
+    if not all(isinstance(f, (int, float)) and not isinstance(f, bool) and 0 < f < sample_rate / 2 for f in freqs):
+        raise ValueError(f"{where}: frequencies must be numbers between 0 and {sample_rate / 2} Hz")
+    cfg = spec.get("config")
+    if not isinstance(cfg, dict):
+        raise ValueError(f"{where}: 'config' must be a table")
+    unknown = set(cfg) - set(config_keys)
+    if unknown:
+        raise ValueError(f"{where}: unknown config keys {sorted(unknown)}")
+    for key in config_keys:
+        value = cfg.get(key)
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+            raise ValueError(f"{where}: config '{key}' must be a positive number")
+    if cfg["amplitude"] > 1:
+        raise ValueError(f"{where}: config 'amplitude' must not exceed 1.0")
+
+    cfg = {key: float(cfg[key]) for key in config_keys}
+    hold_samples = int(round(cfg["hold_duration"] * sample_rate))
+    if hold_samples < 1:
+        raise ValueError(f"{where}: config 'hold_duration' is shorter than one sample")
+    cycle = tuple(Event(k * hold_samples, f, cfg["amplitude"], cfg["mod_freq"], cfg["fade_time"],
+                        cfg["hold_duration"], name, k, 0) for k, f in enumerate(freqs))
+    return Pattern(name, np.array(freqs, dtype=np.float64), cfg, hold_samples, cycle)
+
+def read_patterns(path):
+    # Parse and compile a library without installing it
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            specs = tomllib.load(f)
+        else:
+            specs = json.load(f)
+    if not isinstance(specs, dict) or not specs:
+        raise ValueError(f"{path}: expected a table of named patterns")
+    return {name: compile_pattern(name, spec, path) for name, spec in specs.items()}
+
+def load_patterns(path=None, keep=None):
+    # keep: a pattern name the new library must still define (the one playing)
+    global harmonic_patterns, patterns_path
+    path = path or patterns_path
+    library = read_patterns(path)
+    if keep is not None and keep not in library:
+        raise ValueError(f"{path}: not reloaded, it no longer defines the active pattern '{keep}'")
+    # Rebind rather than mutate, so readers never see a half-loaded library
+    harmonic_patterns = library
+    patterns_path = path
+    return harmonic_patterns
+
+def pattern_library():
+    return harmonic_patterns or load_patterns()
 
 # === USER MENU SELECTION ===
+log_stream = sys.stdout  # switched to stderr when PCM goes to stdout
+
 def select_pattern():
-    print("🌐 Select a Resonator Pattern:")
+    harmonic_patterns = pattern_library()
+    print("🌐 Select a Resonator Pattern:", file=log_stream)
     for i, key in enumerate(harmonic_patterns.keys(), start=1):
-        print(f"{i}. {key}")
+        print(f"{i}. {key}", file=log_stream)
     while True:
         try:
-            choice = int(input("\nEnter the number of your choice: "))
+            print("\nEnter the number of your choice: ", end="", file=log_stream, flush=True)
+            choice = int(input())
             pattern_keys = list(harmonic_patterns.keys())
             if 1 <= choice <= len(pattern_keys):
                 return pattern_keys[choice - 1]
             else:
-                print("Please enter a number between 1 and 5.")
+                print(f"Please enter a number between 1 and {len(pattern_keys)}.", file=log_stream)
         except ValueError:
-            print("Invalid input. Please enter a number.")
+            print("Invalid input. Please enter a number.", file=log_stream)
 
 # === SETUP BASED ON SELECTION ===
-active_pattern_name = select_pattern()
-active_pattern = harmonic_patterns[active_pattern_name]
-frequencies = active_pattern["frequencies"]
-config = active_pattern["config"]
+active_pattern = None
+active_pattern_name = None
+frequencies = []
+config = {}
 
-# === AUDIO CONFIGURATION ===
-sample_rate = 44100
-amplitude = config["amplitude"]
-mod_freq = config["mod_freq"]
-fade_time = config["fade_time"]
-hold_duration = config["hold_duration"]
+def use_pattern(name):
+    global active_pattern, active_pattern_name, frequencies, config
+    harmonic_patterns = pattern_library()
+    if name not in harmonic_patterns:
+        raise ValueError(f"unknown pattern '{name}' (available: {', '.join(harmonic_patterns)})")
+    active_pattern = harmonic_patterns[name]
+    active_pattern_name = name
+    frequencies = active_pattern.frequencies
+    config = active_pattern.config
+
+# === TIMELINE ===
+def pattern_timeline(pattern, start_sample=0, generation=0):
+    # Integer sample stamps, so transitions never drift no matter how long we run
+    cycle_samples = pattern.hold_samples * len(pattern.cycle)
+    cycle_start = start_sample
+    while True:
+        for event in pattern.cycle:
+            yield event._replace(sample=cycle_start + event.sample, generation=generation)
+        cycle_start += cycle_samples
+
+def freq_at(segment, n):
+    # Frequency used for absolute sample n (scalar or array) within a segment
+    k = n - segment.start + 1
+    return np.where(k < segment.glide_len, segment.from_freq + segment.step * k, segment.target_freq)
+
+def begin_segment(previous, event, at):
+    from_freq = float(freq_at(previous, at - 1)) if previous is not None else event.freq
+    freq_diff = event.freq - from_freq
+    max_step = 1.0 / sample_rate  # limit frequency stepping
+    step = float(np.clip(freq_diff / (sample_rate * event.fade_time), -max_step, max_step))
+    glide_len = int(np.ceil(abs(freq_diff / step))) if step else 0
+    return Segment(at, from_freq, event.freq, step, glide_len, event.amplitude, event.mod_freq)
+
+def synthesize(out, start, segment):
+    # Render len(out) stereo frames beginning at absolute sample `start`
+    n = np.arange(start, start + len(out), dtype=np.int64)
+    t = n / sample_rate  # exact time from the sample clock (no accumulated drift)
+    freq = freq_at(segment, n)
+
+    # Smoothed amplitude modulation
+    mod = 0.75 + 0.25 * np.sin(2 * np.pi * segment.mod_freq * t)
+
+    # Stereo output with slight binaural offset
+    out[:, 0] = segment.amplitude * mod * np.sin(2 * np.pi * freq * t)
+    out[:, 1] = segment.amplitude * mod * np.sin(2 * np.pi * (freq + binaural_offset) * t)
+
+# === LOCK-FREE EVENT QUEUE ===
+class EventQueue:
+    """Single-producer/single-consumer ring buffer of timeline events.
+
+    Only the producer writes ``head`` and only the consumer writes ``tail``, so
+    the audio callback never waits on a lock held by the control thread.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0
+        self.tail = 0
+
+    def push(self, event):
+        if self.head - self.tail >= self.capacity:
+            return False
+        self.slots[self.head % self.capacity] = event
+        self.head += 1  # publish only after the slot is filled
+        return True
+
+    def peek(self):
+        if self.tail == self.head:
+            return None
+        return self.slots[self.tail % self.capacity]
+
+    def pop(self):
+        self.tail += 1
+
+# === CALLBACK INSTRUMENTATION ===
+class CallbackStats:
+    """Fixed-size record of callback load (execution time / block deadline).
+
+    Everything is preallocated, so ``record`` only bumps counters and never
+    grows a container from inside the audio callback.
+    """
+
+    bin_width = 0.01  # 1% of the block deadline per histogram bin
+    max_load = 2.0    # everything at or above 200% lands in the last bin
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.histogram = [0] * (int(self.max_load / self.bin_width) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+        self.calls = 0
+        self.frames = 0
+        self.busy_time = 0.0
+        self.worst_load = 0.0
+        self.late_calls = 0
+        self.underflows = 0
+        self.overflows = 0
+
+    def record(self, elapsed, frames, status):
+        load = elapsed * self.sample_rate / frames if frames else 0.0
+        index = int(load / self.bin_width)
+        self.histogram[index if index < len(self.histogram) else -1] += 1
+        self.calls += 1
+        self.frames += frames
+        self.busy_time += elapsed
+        if load > self.worst_load:
+            self.worst_load = load
+        if load >= 1.0:
+            self.late_calls += 1
+        if status:
+            if status.output_underflow or status.input_underflow:
+                self.underflows += 1
+            if status.output_overflow or status.input_overflow:
+                self.overflows += 1
+
+    def percentile(self, q):
+        # Upper edge of the bin holding the q-th percentile
+        if not self.calls:
+            return 0.0
+        rank = q / 100.0 * self.calls
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return (i + 1) * self.bin_width
+        return self.max_load
+
+    def summary(self):
+        mean = self.busy_time * self.sample_rate / self.frames if self.frames else 0.0
+        return (f"callbacks: {self.calls} | load mean {mean:.1%} p99 {self.percentile(99):.0%} "
+                f"worst {self.worst_load:.1%} | late {self.late_calls} | "
+                f"underflows {self.underflows} | overflows {self.overflows}")
 
 # === AUDIO STATE ===
-current_freq = frequencies[0]
-target_freq = frequencies[0]
-pattern_index = 0
-phase = 0.0
-mod_phase = 0.0
+event_queue = EventQueue()    # control thread -> callback: upcoming transitions
+applied_queue = EventQueue()  # callback -> control thread: transitions to log
+generation = 0                # bumped by the control thread on every pattern switch
+requested_pattern = None      # set by switch_pattern(), consumed by the control thread
+switch_latency = 0.1          # seconds between a switch request and its first event
+sample_clock = 0  # absolute index of the next sample the callback renders
+segment = None
+current_freq = 0.0
+events_applied = 0
+callback_stats = CallbackStats(sample_rate)
+stats_interval = 60.0  # seconds between load reports
 should_run = True
 
 # === LOGGING FUNCTION ===
 def log_transition(pattern_name, freq, config):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"[{now}] Pattern: {pattern_name.upper()} | Frequency: {freq} Hz")
-    print(f"   → Amplitude: {config['amplitude']}")
-    print(f"   → Modulation Frequency: {config['mod_freq']} Hz")
-    print(f"   → Fade Time: {config['fade_time']} s")
-    print(f"   → Hold Duration: {config['hold_duration']} s\n")
+    print(f"[{now}] Pattern: {pattern_name.upper()} | Frequency: {freq} Hz", file=log_stream)
+    print(f"   → Amplitude: {config['amplitude']}", file=log_stream)
+    print(f"   → Modulation Frequency: {config['mod_freq']} Hz", file=log_stream)
+    print(f"   → Fade Time: {config['fade_time']} s", file=log_stream)
+    print(f"   → Hold Duration: {config['hold_duration']} s\n", file=log_stream, flush=True)
+
+def log_callback_stats(stats):
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{now}] Audio {stats.summary()}", file=log_stream, flush=True)
 
 # === AUDIO CALLBACK FOR CLEAN REAL-TIME STREAMING ===
 def audio_callback(outdata, frames, time_info, status):
-    global phase, mod_phase, current_freq, target_freq
+    global sample_clock, segment, current_freq, events_applied
+    started = time.perf_counter()
 
-    freq_diff = target_freq - current_freq
-    freq_step = freq_diff / (sample_rate * fade_time)
-    max_step = 1.0 / sample_rate  # limit frequency stepping
+    start = sample_clock
+    end = start + frames
+    pos = 0
 
-    left = np.zeros(frames)
-    right = np.zeros(frames)
+    # Apply every queued event that falls inside this block at its exact sample
+    event = event_queue.peek()
+    while event is not None:
+        if event.generation != generation:
+            # Left over from before a pattern switch
+            event_queue.pop()
+            event = event_queue.peek()
+            continue
+        if event.sample >= end:
+            break
+        cut = max(event.sample - start, pos)  # a late event lands at the earliest free sample
+        if cut > pos and segment is not None:
+            synthesize(outdata[pos:cut], start + pos, segment)
+            pos = cut
+        segment = begin_segment(segment, event, start + cut)
+        applied_queue.push(event)
+        events_applied += 1
+        event_queue.pop()
+        event = event_queue.peek()
 
-    for i in range(frames):
-        # Smooth frequency step limit
-        freq_step = np.clip(freq_step, -max_step, max_step)
-        current_freq += freq_step
+    if segment is None:
+        outdata[:] = 0
+    elif pos < frames:
+        synthesize(outdata[pos:], start + pos, segment)
+        current_freq = float(freq_at(segment, end - 1))
+    sample_clock = end
+    callback_stats.record(time.perf_counter() - started, frames, status)
 
-        # Smoothed amplitude modulation
-        mod = 0.75 + 0.25 * np.sin(2 * np.pi * mod_freq * mod_phase)
+# === PATTERN CYCLE THREAD ===
+def switch_pattern(name):
+    # Safe to call from any thread; the control thread performs the switch
+    global requested_pattern
+    if name not in pattern_library():
+        raise ValueError(f"unknown pattern '{name}'")
+    requested_pattern = name
 
-        # Stereo output with slight binaural offset
-        left[i] = amplitude * mod * np.sin(2 * np.pi * current_freq * phase)
-        right[i] = amplitude * mod * np.sin(2 * np.pi * (current_freq + 0.05) * phase)
+def pattern_control():
+    # Keeps the event queue topped up ahead of the callback, performs pattern
+    # switches, logs each transition once the callback has actually applied
+    # it, and reports callback load every stats_interval seconds.
+    global generation, requested_pattern
+    timeline = pattern_timeline(active_pattern, sample_clock, generation)
+    next_event = next(timeline)
+    next_report = time.monotonic() + stats_interval
+    while should_run:
+        if requested_pattern is not None:
+            use_pattern(requested_pattern)
+            requested_pattern = None
+            # Queued events of the old pattern go stale; the callback drops them
+            generation += 1
+            if segment_cache is not None:
+                # Keyed by generation, so an old event the callback is applying
+                # right now still finds the buffers it was scheduled against
+                # (a reload may have changed the pattern under the same name)
+                cached_library[active_pattern_name, generation] = segment_cache.load(active_pattern)
+                for key in [key for key in cached_library if key[1] < generation - 1]:
+                    del cached_library[key]
+            start = sample_clock + int(switch_latency * sample_rate)
+            timeline = pattern_timeline(active_pattern, start, generation)
+            next_event = next(timeline)
+        while event_queue.push(next_event):
+            next_event = next(timeline)
+        event = applied_queue.peek()
+        while event is not None:
+            # The event carries its own config, so a reload can't pull it out from under us
+            log_transition(event.pattern, event.freq, event._asdict())
+            applied_queue.pop()
+            event = applied_queue.peek()
+        if time.monotonic() >= next_report:
+            log_callback_stats(callback_stats)
+            next_report += stats_interval
+        time.sleep(0.05)
 
-        # Continuous phase accumulation (no wrap)
-        phase += 1 / sample_rate
-        mod_phase += 1 / sample_rate
+# === PARALLEL OFFLINE RENDERING ===
+def timeline_segments(pattern, total_samples):
+    # Replays the schedule analytically: each segment's glide start is derived
+    # from the previous one, exactly as the callback would have applied it.
+    segment = None
+    for event in pattern_timeline(pattern):
+        if event.sample >= total_samples:
+            return
+        segment = begin_segment(segment, event, event.sample)
+        yield segment
 
-    outdata[:] = np.column_stack((left, right))
+def render_chunk(job):
+    start, stop, segments = job
+    out = np.empty((stop - start, 2))
+    for i, seg in enumerate(segments):
+        seg_start = max(seg.start, start)
+        seg_stop = min(segments[i + 1].start, stop) if i + 1 < len(segments) else stop
+        synthesize(out[seg_start - start:seg_stop - start], seg_start, seg)
+    return (np.clip(out, -1.0, 1.0) * 32767).astype("<i2").tobytes()
 
-# === PATTERN CYCLE THREAD ===
-def pattern_control():
-    global pattern_index, target_freq, amplitude, mod_freq, fade_time, hold_duration
-    while should_run:
-        freq = frequencies[pattern_index]
-        target_freq = freq
-        log_transition(active_pattern_name, freq, config)
+def chunk_jobs(pattern, total_samples, chunk_samples):
+    segments = timeline_segments(pattern, total_samples)
+    active = [next(segments)]
+    upcoming = next(segments, None)
+    for start in range(0, total_samples, chunk_samples):
+        stop = min(start + chunk_samples, total_samples)
+        # Drop segments that ended before this chunk, pull in those starting inside it
+        while upcoming is not None and upcoming.start <= start:
+            active = [upcoming]
+            upcoming = next(segments, None)
+        active = active[-1:]
+        while upcoming is not None and upcoming.start < stop:
+            active.append(upcoming)
+            upcoming = next(segments, None)
+        yield start, stop, list(active)
+
+def render_to_file(path, duration, workers=None, chunk_seconds=60.0):
+    total_samples = int(round(duration * sample_rate))
+    chunk_samples = max(1, int(round(chunk_seconds * sample_rate)))
+    workers = workers or os.cpu_count() or 1
+    jobs = chunk_jobs(active_pattern, total_samples, chunk_samples)
+
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        if workers == 1:
+            for job in jobs:
+                wav.writeframes(render_chunk(job))
+            return
+        # Keep a bounded window of chunks in flight and stitch them in order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for job in jobs:
+                in_flight.append(pool.submit(render_chunk, job))
+                if len(in_flight) >= 2 * workers:
+                    wav.writeframes(in_flight.popleft().result())
+            while in_flight:
+                wav.writeframes(in_flight.popleft().result())
+
+# === SEGMENT CACHE ===
+def periodic_segments(pattern, max_cycles=1000, tolerance=1e-6):
+    # One cycle of the live trajectory once it has settled. Glides are limited
+    # to 1 Hz/s, so the engine can take several cycles to creep toward its
+    # targets; from then on every cycle starts from the same frequencies.
+    count = len(pattern.cycle)
+    segments = timeline_segments(pattern, count * pattern.hold_samples * max_cycles)
+    cycle = [next(segments) for _ in range(count)]
+    for _ in range(max_cycles - 1):
+        following = [next(segments) for _ in range(count)]
+        settled = max(abs(a.from_freq - b.from_freq) for a, b in zip(cycle, following)) <= tolerance
+        cycle = following
+        if settled:
+            break
+    offset = cycle[0].start
+    return [seg._replace(start=seg.start - offset) for seg in cycle]
+
+# Pre-rendered segments of one pattern plus the equal-power ramps used to
+# crossfade into them (columns, so they broadcast over both channels)
+CachedPattern = namedtuple("CachedPattern", "buffers fade_in fade_out")
+
+class SegmentCache:
+    """Pre-renders each glide+hold segment of a pattern cycle exactly once.
+
+    The segments follow the live engine's settled trajectory and are rendered
+    back to back on one time base, so consecutive segments join seamlessly.
+    Each buffer runs ``crossfade`` seconds past its hold; the callback fades
+    that tail out under the next segment wherever the audio is not continuous
+    (the wrap back to the top of the cycle and pattern switches). Buffers live
+    in memory, or as memory-mapped float32 files under ``cache_dir`` keyed by a
+    hash of the pattern config and the segment start frequencies.
+    """
 
-        amplitude = config["amplitude"]
-        mod_freq = config["mod_freq"]
-        fade_time = config["fade_time"]
-        hold_duration = config["hold_duration"]
+    version = 2
 
-        pattern_index = (pattern_index + 1) % len(frequencies)
-        time.sleep(hold_duration)
+    def __init__(self, cache_dir=None, crossfade=0.05):
+        self.cache_dir = cache_dir
+        self.crossfade = crossfade
+        self.memory = {}
+
+    def key(self, pattern, segments):
+        spec = dict(version=self.version, frequencies=pattern.frequencies.tolist(), config=pattern.config,
+                    starts=[seg.from_freq for seg in segments], sample_rate=sample_rate,
+                    binaural_offset=binaural_offset, crossfade=self.crossfade)
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    def load(self, pattern):
+        segments = periodic_segments(pattern)
+        key = self.key(pattern, segments)
+        if key in self.memory:
+            return self.memory[key]
+        fade_samples = min(int(round(self.crossfade * sample_rate)), pattern.hold_samples)
+        shape = (pattern.hold_samples + fade_samples, 2)
+        paths = [os.path.join(self.cache_dir, f"{key}-{k}.f32") for k in range(len(segments))] if self.cache_dir else []
+        if paths and all(os.path.exists(path) for path in paths):
+            buffers = [np.memmap(path, dtype=np.float32, mode="r", shape=shape) for path in paths]
+        else:
+            buffers = self.render(segments, shape)
+            if paths:
+                buffers = [self.store(path, buffer) for path, buffer in zip(paths, buffers)]
+        ramp = np.linspace(0.0, np.pi / 2, fade_samples, dtype=np.float32)[:, None]
+        self.memory[key] = CachedPattern(buffers, np.sin(ramp), np.cos(ramp))
+        return self.memory[key]
+
+    def render(self, segments, shape):
+        # Render past the hold so the tail can fade under whatever follows
+        buffers = []
+        for seg in segments:
+            out = np.empty(shape)
+            synthesize(out, seg.start, seg)
+            buffers.append(out.astype(np.float32))
+        return buffers
+
+    def store(self, path, buffer):
+        # Write to a temp file first so a concurrent reader never sees a partial segment
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, path)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=buffer.shape)
+
+segment_cache = None  # set by main() to play from pre-rendered segments
+cached_library = {}   # (pattern name, generation) -> CachedPattern, filled by the control thread
+cached_buffer = None  # buffer of the segment currently playing
+cached_start = 0      # sample at which that segment began
+cached_event = None   # event that started it
+fade_buffer = None    # buffer being faded out under it, if any
+fade_offset = 0       # position in fade_buffer where the fade began
+fade_start = 0        # sample at which the fade began
+fade_ramps = None     # (fade_in, fade_out) of the pattern faded into
+
+def cached_audio_callback(outdata, frames, time_info, status):
+    # Same scheduling as audio_callback, but the samples are copied from the
+    # segment cache instead of being synthesized.
+    global sample_clock, events_applied, cached_buffer, cached_start, cached_event
+    global fade_buffer, fade_offset, fade_start, fade_ramps
+    started = time.perf_counter()
+
+    start = sample_clock
+    end = start + frames
+    pos = 0
+
+    event = event_queue.peek()
+    while event is not None:
+        if event.generation != generation:
+            event_queue.pop()
+            event = event_queue.peek()
+            continue
+        if event.sample >= end:
+            break
+        cut = max(event.sample - start, pos)
+        if cut > pos:
+            copy_cached(outdata[pos:cut], start + pos)
+            pos = cut
+        cached = cached_library[event.pattern, event.generation]
+        continuous = (cached_event is not None and event.generation == cached_event.generation
+                      and event.index == cached_event.index + 1)
+        if cached_buffer is not None and not continuous:
+            # Wrapping to the top of the cycle or switching patterns: fade out
+            # whatever is actually playing rather than cutting it
+            fade_buffer = cached_buffer
+            fade_offset = start + cut - cached_start
+            fade_start = start + cut
+            fade_ramps = (cached.fade_in, cached.fade_out)
+        cached_buffer = cached.buffers[event.index]
+        cached_start = start + cut
+        cached_event = event
+        applied_queue.push(event)
+        events_applied += 1
+        event_queue.pop()
+        event = event_queue.peek()
+
+    if pos < frames:
+        copy_cached(outdata[pos:], start + pos)
+    sample_clock = end
+    callback_stats.record(time.perf_counter() - started, frames, status)
+
+def copy_cached(out, start):
+    global fade_buffer
+    if cached_buffer is None:
+        out[:] = 0
+        return
+    offset = start - cached_start
+    count = max(0, min(len(out), len(cached_buffer) - offset))
+    out[:count] = cached_buffer[offset:offset + count]
+    out[count:] = 0
+    if fade_buffer is None:
+        return
+    fade_in, fade_out = fade_ramps
+    into = start - fade_start
+    count = min(len(out), len(fade_in) - into)
+    if count <= 0:
+        fade_buffer = None
+        return
+    source = fade_buffer[fade_offset + into:fade_offset + into + count]
+    out[:count] *= fade_in[into:into + count]
+    out[:len(source)] += source * fade_out[into:into + len(source)]
+
+# === OUTPUT BACKENDS ===
+class OutputBackend:
+    """Pulls blocks from an audio callback and delivers them to an output.
+
+    Every backend drives the same ``callback(outdata, frames, time_info, status)``
+    signature that sounddevice uses, and imports its dependencies lazily.
+    """
+
+    def __init__(self, sample_rate, channels=2, blocksize=1024, max_frames=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.max_frames = max_frames
+        self.frames_written = 0
+        self.running = False
+
+    def start(self, callback):
+        raise NotImplementedError
+
+    def stop(self):
+        self.running = False
+
+class SoundDeviceBackend(OutputBackend):
+    def start(self, callback):
+        import sounddevice as sd
+
+        def counted(outdata, frames, time_info, status):
+            callback(outdata, frames, time_info, status)
+            self.frames_written += frames
+            if self.max_frames is not None and self.frames_written >= self.max_frames:
+                self.running = False
+
+        self.stream = sd.OutputStream(callback=counted, samplerate=self.sample_rate,
+                                      channels=self.channels, blocksize=self.blocksize)
+        self.stream.start()
+        self.running = True
+
+    def stop(self):
+        # running is already False once max_frames is reached; the stream is still open
+        stream = getattr(self, "stream", None)
+        if stream is not None:
+            stream.stop()
+            stream.close()
+            self.stream = None
+        super().stop()
+
+class BlockSinkBackend(OutputBackend):
+    """Calls the callback from its own thread and hands each block to ``write``.
+
+    Runs as fast as the sink accepts data unless ``realtime`` is set, in which
+    case blocks are paced to the wall clock (e.g. for live streaming servers).
+    """
+
+    def __init__(self, sample_rate, channels=2, blocksize=1024, max_frames=None, realtime=False):
+        super().__init__(sample_rate, channels, blocksize, max_frames)
+        self.realtime = realtime
+
+    def start(self, callback):
+        self.open()
+        self.running = True
+        self.thread = threading.Thread(target=self._pump, args=(callback,), daemon=True)
+        self.thread.start()
+
+    def _pump(self, callback):
+        block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        started = time.monotonic()
+        while self.running:
+            frames = self.blocksize
+            if self.max_frames is not None:
+                frames = min(frames, self.max_frames - self.frames_written)
+                if frames <= 0:
+                    break
+            callback(block[:frames], frames, None, None)
+            self.write(block[:frames])
+            self.frames_written += frames
+            if self.realtime:
+                ahead = self.frames_written / self.sample_rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        self.running = False
+
+    def stop(self):
+        super().stop()
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+        self.close()
+
+    def open(self):
+        pass
+
+    def write(self, block):
+        pass
+
+    def close(self):
+        pass
+
+def to_pcm16(block):
+    return (np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+class WavFileBackend(BlockSinkBackend):
+    def __init__(self, path, sample_rate, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self.path = path
+
+    def open(self):
+        self.wav = wave.open(self.path, "wb")
+        self.wav.setnchannels(self.channels)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(self.sample_rate)
+
+    def write(self, block):
+        self.wav.writeframes(to_pcm16(block))
+
+    def close(self):
+        self.wav.close()
+
+class PipeBackend(BlockSinkBackend):
+    """Raw interleaved PCM on stdout: s16le by default, or f32le.
+
+    e.g. ``... --output pipe | ffmpeg -f s16le -ar 44100 -ac 2 -i - out.mp3``
+    """
+
+    def __init__(self, sample_rate, sample_format="s16le", stream=None, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self.sample_format = sample_format
+        self.stream = stream
+
+    def open(self):
+        if self.stream is None:
+            self.stream = sys.stdout.buffer
+
+    def write(self, block):
+        if self.sample_format == "f32le":
+            data = block.astype("<f4").tobytes()
+        else:
+            data = to_pcm16(block)
+        try:
+            self.stream.write(data)
+        except BrokenPipeError:
+            self.running = False
+
+    def close(self):
+        try:
+            self.stream.flush()
+        except BrokenPipeError:
+            pass
+
+class NullBackend(BlockSinkBackend):
+    """Discards the audio and only counts frames (tests, load measurements)."""
+
+backends = {
+    "sounddevice": SoundDeviceBackend,
+    "wav": WavFileBackend,
+    "pipe": PipeBackend,
+    "null": NullBackend,
+}
+
+def make_backend(name, path=None, duration=None, blocksize=None, realtime=False):
+    max_frames = int(round(duration * sample_rate)) if duration else None
+    if name == "sounddevice":
+        # 0 lets PortAudio pick the optimal (possibly varying) block size
+        return SoundDeviceBackend(sample_rate, blocksize=blocksize or 0, max_frames=max_frames)
+    blocksize = blocksize or 1024
+    if name == "wav":
+        if not path:
+            raise ValueError("the wav backend needs an output path")
+        return WavFileBackend(path, sample_rate, blocksize=blocksize, max_frames=max_frames, realtime=realtime)
+    if name == "pipe":
+        return PipeBackend(sample_rate, blocksize=blocksize, max_frames=max_frames, realtime=realtime)
+    if name == "null":
+        return NullBackend(sample_rate, blocksize=blocksize, max_frames=max_frames, realtime=realtime)
+    raise ValueError(f"unknown output backend: {name}")
+
+# === RUNTIME CONTROL ===
+def listen_for_commands(stream):
+    # One command per line: a pattern name switches to that pattern, "reload"
+    # re-reads the pattern file and re-applies the active pattern.
+    for line in stream:
+        command = line.strip()
+        if not command:
+            continue
+        try:
+            if command == "reload":
+                load_patterns(keep=active_pattern_name)
+                command = active_pattern_name
+            switch_pattern(command)
+        except (OSError, ValueError) as error:
+            print(f"⚠️  {error}", file=log_stream, flush=True)
 
 # === MAIN LOOP ===
-def main():
-    global should_run
-    print(f"\n🔊 Starting symbolic resonance engine in pattern: {active_pattern_name.upper()}...\n")
+def main(backend=None, cache=None, listen=False):
+    global should_run, log_stream, segment_cache
+    backend = backend or SoundDeviceBackend(sample_rate, blocksize=0)
+    if isinstance(backend, PipeBackend) and backend.stream in (None, sys.stdout.buffer):
+        log_stream = sys.stderr
+    print(f"\n🔊 Starting symbolic resonance engine in pattern: {active_pattern_name.upper()}...\n", file=log_stream)
 
-    stream = sd.OutputStream(callback=audio_callback, samplerate=sample_rate, channels=2)
-    stream.start()
+    callback = audio_callback
+    if cache is not None:
+        print("Pre-rendering pattern segments...", file=log_stream, flush=True)
+        segment_cache = cache
+        cached_library[active_pattern_name, generation] = cache.load(active_pattern)
+        callback = cached_audio_callback
 
+    # Start the scheduler first so the opening event is queued for sample 0
+    should_run = True
     thread = threading.Thread(target=pattern_control, daemon=True)
     thread.start()
+    if listen:
+        threading.Thread(target=listen_for_commands, args=(sys.stdin,), daemon=True).start()
+
+    backend.start(callback)
 
     try:
-        while True:
-            time.sleep(1)
+        while backend.running:
+            time.sleep(0.1 if backend.max_frames else 1)
     except KeyboardInterrupt:
-        print("\n🛑 Stopping...")
+        print("\n🛑 Stopping...", file=log_stream)
+    finally:
         should_run = False
-        stream.stop()
-        stream.close()
+        backend.stop()
+        log_callback_stats(callback_stats)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Symbolic resonance engine")
+    parser.add_argument("--pattern", help="pattern to play (prompts when omitted on a terminal)")
+    parser.add_argument("--patterns", metavar="FILE", help="pattern library (.json or .toml, default: patterns.json)")
+    parser.add_argument("--list-patterns", action="store_true", help="list the available patterns and exit")
+    parser.add_argument("--listen", action="store_true",
+                        help="read pattern names (or 'reload') from stdin and switch without restarting")
+    parser.add_argument("--output", choices=sorted(backends), default="sounddevice", help="audio output backend")
+    parser.add_argument("--path", help="output file for the wav backend")
+    parser.add_argument("--blocksize", type=int, default=None,
+                        help="frames per callback (default: 1024, or device-chosen for sounddevice)")
+    parser.add_argument("--realtime", action="store_true", help="pace file/pipe/null outputs to the wall clock")
+    parser.add_argument("--cache", action="store_true",
+                        help="play from pre-rendered, crossfaded pattern segments (near-zero CPU)")
+    parser.add_argument("--cache-dir", help="keep cached segments as memory-mapped files in this directory")
+    parser.add_argument("--render", metavar="WAV", help="render offline to a WAV file using all cores")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds (offline render default: 3600)")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: all cores)")
+    parser.add_argument("--chunk", type=float, default=60.0, help="offline render chunk length in seconds")
+    args = parser.parse_args()
+    if args.output == "pipe":
+        log_stream = sys.stderr
+    try:
+        load_patterns(args.patterns)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.list_patterns:
+        for name, pattern in harmonic_patterns.items():
+            print(f"{name}: {', '.join(f'{f:g}' for f in pattern.frequencies)} Hz")
+        sys.exit(0)
+    if args.pattern:
+        pattern_name = args.pattern
+    elif sys.stdin.isatty():
+        pattern_name = select_pattern()
+    else:
+        parser.error("--pattern is required when stdin is not a terminal")
+    try:
+        use_pattern(pattern_name)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.render:
+        duration = args.duration or 3600.0
+        render_to_file(args.render, duration, args.workers, args.chunk)
+        print(f"Rendered {duration} s of {active_pattern_name.upper()} to {args.render}")
+    else:
+        cache = SegmentCache(args.cache_dir) if args.cache or args.cache_dir else None
+        main(make_backend(args.output, args.path, args.duration, args.blocksize, args.realtime), cache, args.listen)
@@ -0,0 +1,266 @@
+"""
+Streaming spectral check for SymbolicResonanceEngine output.
+
+Reads a rendered WAV file, or raw PCM from stdin, in blocks and runs an
+overlapping Hann-windowed FFT over it. For every analysis frame it reports the
+strongest peak frequencies per channel, the binaural offset between the left
+and right carrier, and the amplitude-modulation rate and depth (from the
+sidebands around the carrier). Sample-level discontinuities are flagged as
+they stream past. Memory use is fixed by the window size, so multi-hour
+renders can be checked in CI.
+
+Usage:
+    python analyze_resonance.py render.wav --expect 528 --max-glitches 0
+    python SymbolicResonanceEngine.py --pattern healing --output pipe | python analyze_resonance.py -
+"""
+
+import argparse
+import json
+import sys
+import wave
+
+import numpy as np
+
+
+# === INPUT ===
+def wav_blocks(path, block_frames):
+    wav = wave.open(path, "rb")
+    width = wav.getsampwidth()
+    if width not in (2, 4):
+        raise ValueError(f"{path}: only 16- and 32-bit PCM WAV files are supported")
+    dtype, scale = ("<i2", 32768.0) if width == 2 else ("<i4", 2147483648.0)
+    channels = wav.getnchannels()
+
+    def blocks():
+        with wav:
+            while True:
+                data = wav.readframes(block_frames)
+                if not data:
+                    return
+                yield np.frombuffer(data, dtype=dtype).reshape(-1, channels) / scale
+
+    return wav.getframerate(), channels, blocks()
+
+
+def raw_blocks(stream, block_frames, sample_format, rate, channels):
+    dtype, scale = ("<i2", 32768.0) if sample_format == "s16le" else ("<f4", 1.0)
+    frame_bytes = np.dtype(dtype).itemsize * channels
+
+    def blocks():
+        pending = b""
+        while True:
+            data = stream.read(block_frames * frame_bytes)
+            if not data:
+                return
+            data = pending + data
+            usable = len(data) - len(data) % frame_bytes
+            pending = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=dtype).reshape(-1, channels) / scale
+
+    return rate, channels, blocks()
+
+
+# === ANALYSIS ===
+class SpectralMonitor:
+    """Overlapping windowed FFT and discontinuity detection over a sample stream.
+
+    All buffers are allocated up front: a ring of ``window`` frames for the
+    FFT and the last two samples per channel for the second difference.
+    """
+
+    def __init__(self, rate, channels, window=1 << 18, overlap=0.75, peaks=3, min_separation=25.0,
+                 mod_range=(0.5, 20.0), glitch_factor=8.0, glitch_floor=0.01):
+        self.rate = rate
+        self.channels = channels
+        self.window = window
+        self.hop = max(1, int(window * (1.0 - overlap)))
+        self.peaks = peaks
+        self.min_separation = min_separation
+        self.mod_range = mod_range
+        self.glitch_factor = glitch_factor
+        self.glitch_floor = glitch_floor
+
+        self.ring = np.zeros((window, channels))
+        self.write = 0
+        self.filled = 0
+        self.since_frame = 0
+        self.frames_seen = 0
+        self.taper = np.hanning(window)[:, None]
+        self.bin_hz = rate / window
+
+        self.tail = None  # last two frames of the previous block
+        self.curvature = None  # running mean square of the second difference
+        self.last_glitch = -rate
+
+    def feed(self, block):
+        """Consume a (frames, channels) block and return the reports it completed."""
+        reports = self.find_glitches(block)
+        pos = 0
+        while pos < len(block):
+            take = min(len(block) - pos, self.hop - self.since_frame, self.window - self.write)
+            self.ring[self.write:self.write + take] = block[pos:pos + take]
+            self.write = (self.write + take) % self.window
+            self.filled = min(self.window, self.filled + take)
+            self.since_frame += take
+            self.frames_seen += take
+            pos += take
+            if self.since_frame == self.hop and self.filled == self.window:
+                reports.append(self.analyze())
+            if self.since_frame == self.hop:
+                self.since_frame = 0
+        return reports
+
+    def find_glitches(self, block):
+        # A smooth sinusoid has a small, steady second difference; a click or a
+        # phase jump shows up as an isolated spike far above its running level.
+        joined = block if self.tail is None else np.concatenate((self.tail, block))
+        offset = self.frames_seen - (len(joined) - len(block)) + 2
+        if len(joined) < 3:
+            return []
+        d2 = np.abs(joined[2:] - 2 * joined[1:-1] + joined[:-2])
+        level = float(np.mean(d2 ** 2))
+        if self.curvature is None:
+            self.curvature = level
+        threshold = max(self.glitch_floor, self.glitch_factor * np.sqrt(self.curvature))
+        reports = []
+        for index, channel in zip(*np.nonzero(d2 > threshold)):
+            at = offset + int(index)
+            if at - self.last_glitch > self.rate // 100:  # one report per 10 ms burst
+                reports.append(dict(type="glitch", time=at / self.rate, channel=int(channel),
+                                    jump=float(d2[index, channel]), threshold=threshold))
+            self.last_glitch = at
+        self.curvature = 0.99 * self.curvature + 0.01 * level
+        self.tail = joined[-2:].copy()
+        return reports
+
+    def analyze(self):
+        frame = np.concatenate((self.ring[self.write:], self.ring[:self.write]))
+        spectrum = np.abs(np.fft.rfft(frame * self.taper, axis=0))
+        report = dict(type="frame", time=(self.frames_seen - self.window / 2) / self.rate, channels=[])
+        for ch in range(self.channels):
+            report["channels"].append(self.describe(spectrum[:, ch]))
+        if self.channels == 2 and all(c["peaks"] for c in report["channels"]):
+            left, right = (c["peaks"][0]["freq"] for c in report["channels"])
+            report["binaural_offset"] = right - left
+        return report
+
+    def describe(self, mag):
+        if mag.max() <= 1e-9 * self.window:
+            return dict(peaks=[], mod_freq=None, mod_depth=None)
+        local = np.nonzero((mag[1:-1] > mag[:-2]) & (mag[1:-1] >= mag[2:]) & (mag[1:-1] > mag.max() * 0.01))[0] + 1
+        found = []
+        for k in local[np.argsort(mag[local])[::-1]]:
+            freq, level = self.interpolate(mag, k)
+            if all(abs(freq - p["freq"]) >= self.min_separation for p in found):
+                found.append(dict(freq=freq, level=level))
+                if len(found) == self.peaks:
+                    break
+        if not found:
+            # Energy but no interior peak, e.g. DC or a tone at the edge of the band
+            return dict(peaks=[], mod_freq=None, mod_depth=None)
+
+        # AM with depth m puts sidebands of m/2 times the carrier at carrier ± mod_freq.
+        # Search outside the carrier's main lobe, which widens while the tone glides.
+        carrier = found[0]
+        centre = int(round(carrier["freq"] / self.bin_hz))
+        floor = 0.05 * mag[centre]
+        upper_edge = lower_edge = 1
+        while centre + upper_edge < len(mag) - 1 and mag[centre + upper_edge] > floor:
+            upper_edge += 1
+        while centre - lower_edge > 1 and mag[centre - lower_edge] > floor:
+            lower_edge += 1
+        lo = max(upper_edge, lower_edge, int(self.mod_range[0] / self.bin_hz)) + 1
+        hi = int(self.mod_range[1] / self.bin_hz)
+        if centre - hi < 1 or centre + hi + 1 >= len(mag) or hi <= lo:
+            return dict(peaks=found, mod_freq=None, mod_depth=None)
+        upper = mag[centre + lo:centre + hi + 1]
+        lower = mag[centre - hi:centre - lo + 1][::-1]
+        k = int(np.argmax(upper + lower))
+        if k == 0 or k == len(upper) - 1:
+            # No sideband peak clear of the carrier (e.g. mid-glide smear)
+            return dict(peaks=found, mod_freq=None, mod_depth=None)
+        mod_freq, upper_level = self.interpolate(mag, centre + lo + k)
+        _, lower_level = self.interpolate(mag, centre - lo - k)
+        return dict(peaks=found, mod_freq=mod_freq - carrier["freq"],
+                    mod_depth=(upper_level + lower_level) / carrier["level"])
+
+    def interpolate(self, mag, k):
+        # Parabolic fit on the log magnitude around bin k
+        a, b, c = np.log(mag[k - 1:k + 2] + 1e-300)
+        denom = a - 2 * b + c
+        delta = min(0.5, max(-0.5, 0.5 * (a - c) / denom)) if denom else 0.0
+        return (k + delta) * self.bin_hz, float(np.exp(b - 0.25 * (a - c) * delta))
+
+
+# === REPORTING ===
+def format_report(report):
+    if report["type"] == "glitch":
+        return (f"{report['time']:10.3f}s  ⚠️  discontinuity on channel {report['channel']}: "
+                f"jump {report['jump']:.4f} (threshold {report['threshold']:.4f})")
+    parts = [f"{report['time']:10.3f}s"]
+    for name, channel in zip("LR" if len(report["channels"]) == 2 else "123456789", report["channels"]):
+        peaks = ", ".join(f"{p['freq']:.3f}" for p in channel["peaks"]) or "silence"
+        parts.append(f"{name}: {peaks} Hz")
+    if "binaural_offset" in report:
+        parts.append(f"offset {report['binaural_offset']:+.3f} Hz")
+    first = report["channels"][0]
+    if first["mod_freq"] is not None:
+        parts.append(f"mod {first['mod_freq']:.2f} Hz depth {first['mod_depth']:.2f}")
+    return "  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming spectral verification of resonance output")
+    parser.add_argument("source", help="WAV file, or - for raw interleaved PCM on stdin")
+    parser.add_argument("--format", choices=("s16le", "f32le"), default="s16le", help="raw stdin sample format")
+    parser.add_argument("--rate", type=int, default=44100, help="raw stdin sample rate")
+    parser.add_argument("--channels", type=int, default=2, help="raw stdin channel count")
+    parser.add_argument("--window", type=int, default=1 << 18, help="FFT window in frames (resolution = rate / window)")
+    parser.add_argument("--overlap", type=float, default=0.75, help="fraction of overlap between windows")
+    parser.add_argument("--block", type=int, default=4096, help="frames read per block")
+    parser.add_argument("--peaks", type=int, default=3, help="peaks reported per channel")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per report")
+    parser.add_argument("--expect", type=float, action="append", default=[],
+                        help="frequency (Hz) that must appear as a peak in some frame; repeatable")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="match tolerance for --expect in Hz")
+    parser.add_argument("--max-glitches", type=int, default=None, help="fail if more discontinuities are found")
+    args = parser.parse_args()
+
+    if args.source == "-":
+        rate, channels, blocks = raw_blocks(sys.stdin.buffer, args.block, args.format, args.rate, args.channels)
+    else:
+        rate, channels, blocks = wav_blocks(args.source, args.block)
+    monitor = SpectralMonitor(rate, channels, window=args.window, overlap=args.overlap, peaks=args.peaks)
+
+    frames = glitches = 0
+    seen = {freq: False for freq in args.expect}
+    try:
+        for block in blocks:
+            for report in monitor.feed(block):
+                if report["type"] == "glitch":
+                    glitches += 1
+                else:
+                    frames += 1
+                    for freq in seen:
+                        seen[freq] = seen[freq] or any(abs(p["freq"] - freq) <= args.tolerance
+                                                       for c in report["channels"] for p in c["peaks"])
+                print(json.dumps(report) if args.json else format_report(report), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+    missing = [freq for freq, found in seen.items() if not found]
+    print(f"\nAnalyzed {monitor.frames_seen / rate:.1f} s in {frames} frames, "
+          f"{glitches} discontinuities", file=sys.stderr)
+    failed = False
+    if missing:
+        print(f"Expected frequencies not found: {', '.join(f'{f:g}' for f in missing)} Hz", file=sys.stderr)
+        failed = True
+    if args.max_glitches is not None and glitches > args.max_glitches:
+        print(f"Too many discontinuities: {glitches} > {args.max_glitches}", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Synthesis throughput benchmark for SymbolicResonanceEngine.
+
+Drives audio_callback headlessly (no audio device) for every pattern in the
+pattern library across a range of block sizes and voice counts, and reports
+samples/sec, the real-time factor (processing time / audio time, so anything
+near or above 1.0 would drop out) and per-block latency percentiles against
+the block deadline.
+
+Each voice is an independent engine state (sample clock, glide segment and
+event queue) swapped into the module before its callback runs, so N voices
+cost what N concurrent engines on one core would.
+
+Usage:
+    python bench_resonance.py --output bench.json
+    python bench_resonance.py --baseline bench.json --output new.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+import SymbolicResonanceEngine as engine
+
+voice_globals = ("event_queue", "applied_queue", "sample_clock", "segment", "events_applied",
+                 "cached_buffer", "cached_start", "cached_event", "fade_buffer", "fade_offset", "fade_start",
+                 "fade_ramps")
+
+
+class Voice:
+    """One engine instance's callback state plus the timeline feeding it."""
+
+    def __init__(self, pattern):
+        self.state = dict(event_queue=engine.EventQueue(), applied_queue=engine.EventQueue(),
+                          sample_clock=0, segment=None, events_applied=0, cached_buffer=None, cached_start=0,
+                          cached_event=None, fade_buffer=None, fade_offset=0, fade_start=0, fade_ramps=None)
+        self.timeline = engine.pattern_timeline(pattern)
+        self.next_event = next(self.timeline)
+
+    def feed(self):
+        # What the control thread does: top up the event queue, drain the log queue
+        queue = self.state["event_queue"]
+        while queue.push(self.next_event):
+            self.next_event = next(self.timeline)
+        applied = self.state["applied_queue"]
+        while applied.peek() is not None:
+            applied.pop()
+
+    def activate(self):
+        for name in voice_globals:
+            setattr(engine, name, self.state[name])
+
+    def save(self):
+        for name in voice_globals:
+            self.state[name] = getattr(engine, name)
+
+
+def run_case(pattern, blocksize, voices, seconds, callback):
+    engine.use_pattern(pattern.name)
+    engine.generation = 0
+    players = [Voice(pattern) for _ in range(voices)]
+    outdata = np.zeros((blocksize, 2), dtype=np.float32)
+    blocks = max(1, int(seconds * engine.sample_rate / blocksize))
+    latencies = np.empty(blocks)
+
+    # One untimed block per voice to warm caches and numpy dispatch
+    for voice in players:
+        voice.feed()
+        voice.activate()
+        callback(outdata, blocksize, None, None)
+        voice.save()
+
+    for i in range(blocks):
+        for voice in players:
+            voice.feed()
+        started = time.perf_counter()
+        for voice in players:
+            voice.activate()
+            callback(outdata, blocksize, None, None)
+            voice.save()
+        latencies[i] = time.perf_counter() - started
+
+    busy = float(latencies.sum())
+    audio = blocks * blocksize / engine.sample_rate
+    deadline = blocksize / engine.sample_rate
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return dict(
+        samples_per_sec=blocks * blocksize * voices / busy,
+        realtime_factor=busy / audio,
+        latency_ms=dict(p50=p50 * 1e3, p90=p90 * 1e3, p99=p99 * 1e3, max=latencies.max() * 1e3),
+        deadline_ms=deadline * 1e3,
+        p99_load=p99 / deadline,
+    )
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, case in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = case["samples_per_sec"] / before["samples_per_sec"] - 1.0
+        if change < -threshold:
+            regressions.append((key, change))
+        print(f"{key:40s} {case['samples_per_sec'] / 1e6:8.2f} Msamples/s  {change:+7.1%} vs baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless synthesis benchmark for the resonance engine")
+    parser.add_argument("--patterns", metavar="FILE", help="pattern library (default: patterns.json)")
+    parser.add_argument("--pattern", action="append", help="benchmark only these patterns; repeatable")
+    parser.add_argument("--blocksizes", default="64,256,1024,4096", help="comma-separated frames per callback")
+    parser.add_argument("--voices", default="1,4", help="comma-separated voice counts")
+    parser.add_argument("--modes", default="live", help="comma-separated: live (synthesis) and/or cached")
+    parser.add_argument("--seconds", type=float, default=10.0, help="audio seconds rendered per case")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="fail when samples/sec drops by more than this fraction (default 0.10)")
+    args = parser.parse_args()
+
+    engine.load_patterns(args.patterns)
+    names = args.pattern or list(engine.harmonic_patterns)
+    blocksizes = [int(b) for b in args.blocksizes.split(",")]
+    voice_counts = [int(v) for v in args.voices.split(",")]
+    modes = args.modes.split(",")
+
+    results = {}
+    for mode in modes:
+        callback = engine.cached_audio_callback if mode == "cached" else engine.audio_callback
+        for name in names:
+            pattern = engine.harmonic_patterns[name]
+            if mode == "cached":
+                engine.cached_library[name, 0] = engine.SegmentCache().load(pattern)
+            for blocksize in blocksizes:
+                for voices in voice_counts:
+                    key = f"{mode}/{name}/b{blocksize}/v{voices}"
+                    case = run_case(pattern, blocksize, voices, args.seconds, callback)
+                    results[key] = case
+                    print(f"{key:40s} {case['samples_per_sec'] / 1e6:8.2f} Msamples/s  "
+                          f"RTF {case['realtime_factor']:.4f}  "
+                          f"p99 {case['latency_ms']['p99']:.3f} ms / {case['deadline_ms']:.2f} ms", flush=True)
+
+    if args.output:
+        report = dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+                      sample_rate=engine.sample_rate, seconds=args.seconds, results=results)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import pygame
 import random
+from functools import lru_cache
 
 # Initialize pygame
 pygame.init()
@@ -18,6 +19,7 @@ ANIMATION_TIME_WIN = 2100  # milliseconds for the winning animation
 ANIMATION_TIME_LOSE = 600  # milliseconds for the losing animation
 BLINK_INTERVAL = 400  # milliseconds for each blink
 BORDER_SIZE = 40  # Size of the border
+FPS = 60  # Frame-rate cap; idle frames only poll events
 
 # Game settings
 NUM_CIRCLES = 1
@@ -30,6 +32,7 @@ CIRCLE = (255, 0, 255)  # Bright Magenta
 TEXT_COLOR = (255, 255, 255)  # White
 SHADOW_COLOR = (0, 0, 0)  # Black for shadow
 BLINK_COLOR = (0, 255, 0)  # Neon Green
+SHADOW_OFFSET = 2
 
 # Setup the screen
 screen = pygame.display.set_mode((WIDTH + 2 * BORDER_SIZE, HEIGHT + 2 * BORDER_SIZE))
@@ -42,40 +45,57 @@ font = pygame.font.SysFont("Bauhaus 93", 24, bold=False)
 GRID_START_X = BORDER_SIZE
 GRID_START_Y = BORDER_SIZE
 
+# Strip above the grid holding the score and attempts text
+HUD_RECT = pygame.Rect(0, 0, WIDTH + 2 * BORDER_SIZE, BORDER_SIZE)
+
+def draw_cell(grid, circles_pos, row, col, blink_color=None):
+    rect = pygame.Rect(col * SQUARE_SIZE + GRID_START_X, row * SQUARE_SIZE + GRID_START_Y, SQUARE_SIZE, SQUARE_SIZE)
+    if blink_color:
+        pygame.draw.rect(screen, blink_color, rect)
+    elif grid[row][col]:
+        pygame.draw.rect(screen, GRID_FILL, rect)
+    else:
+        pygame.draw.rect(screen, BACKGROUND, rect)
+    pygame.draw.rect(screen, GRID_OUTLINE, rect, 3)
+
+    # Draw the circle after the cell to ensure it is visible during the blink
+    if (row, col) in circles_pos and not grid[row][col]:
+        pygame.draw.circle(screen, CIRCLE, rect.center, SQUARE_SIZE // 4)
+    return rect
+
 def draw_grid(grid, circles_pos, reveal=False, blink=False):
+    blink_color = None
+    if blink:
+        blink_color = BLINK_COLOR if (pygame.time.get_ticks() % (2 * BLINK_INTERVAL)) < BLINK_INTERVAL else BACKGROUND
     for row in range(ROWS):
         for col in range(COLS):
-            rect = pygame.Rect(col * SQUARE_SIZE + GRID_START_X, row * SQUARE_SIZE + GRID_START_Y, SQUARE_SIZE, SQUARE_SIZE)
-            if blink:
-                color = BLINK_COLOR if (pygame.time.get_ticks() % (2 * BLINK_INTERVAL)) < BLINK_INTERVAL else BACKGROUND
-                pygame.draw.rect(screen, color, rect)
-            elif grid[row][col]:
-                pygame.draw.rect(screen, GRID_FILL, rect)
-            else:
-                pygame.draw.rect(screen, BACKGROUND, rect)
-            pygame.draw.rect(screen, GRID_OUTLINE, rect, 3)
-
-    # Draw circles after the grid to ensure they are visible during the blink
-    for row, col in circles_pos:
-        if not grid[row][col]:
-            rect = pygame.Rect(col * SQUARE_SIZE + GRID_START_X, row * SQUARE_SIZE + GRID_START_Y, SQUARE_SIZE, SQUARE_SIZE)
-            pygame.draw.circle(screen, CIRCLE, rect.center, SQUARE_SIZE // 4)
+            draw_cell(grid, circles_pos, row, col, blink_color)
+
+@lru_cache(maxsize=16)
+def render_label(text, color=TEXT_COLOR, shadow_color=SHADOW_COLOR):
+    # Text with its drop shadow baked in. Rasterizing is the slow part, and the
+    # labels only change on a click, so each string is rendered once
+    text_surface = font.render(text, True, color)
+    shadow_surface = font.render(text, True, shadow_color)
+    label = pygame.Surface((text_surface.get_width() + SHADOW_OFFSET, text_surface.get_height() + SHADOW_OFFSET),
+                           pygame.SRCALPHA)
+    label.blit(shadow_surface, (SHADOW_OFFSET, SHADOW_OFFSET))  # Draw shadow first
+    label.blit(text_surface, (0, 0))  # Then draw text on top
+    return label
 
 def draw_text(points, attempts_remaining):
-    points_text = font.render(f"SCORE: {points}", True, TEXT_COLOR)
-    attempts_text = font.render(f"ATTEMPTS: {attempts_remaining}", True, TEXT_COLOR)
-    shadow_offset = 2
+    # Repaints only the HUD strip and returns it, so it can be updated on its own
+    screen.fill(BACKGROUND, HUD_RECT)
+    screen.set_clip(HUD_RECT)
+    points_label = render_label(f"SCORE: {points}")
+    attempts_label = render_label(f"ATTEMPTS: {attempts_remaining}")
     text_height = BORDER_SIZE // 3  # Adjust this value to position the text higher or lower
+    text_width = attempts_label.get_width() - SHADOW_OFFSET
 
-    # Draw shadow first
-    points_shadow = font.render(f"SCORE: {points}", True, SHADOW_COLOR)
-    attempts_shadow = font.render(f"ATTEMPTS: {attempts_remaining}", True, SHADOW_COLOR)
-    screen.blit(points_shadow, (BORDER_SIZE + 2, text_height + 2))
-    screen.blit(attempts_shadow, (WIDTH // 2 + BORDER_SIZE - attempts_text.get_width() // 2 + shadow_offset, text_height + 2))
-
-    # Then draw text on top
-    screen.blit(points_text, (BORDER_SIZE, text_height))
-    screen.blit(attempts_text, (WIDTH // 2 + BORDER_SIZE - attempts_text.get_width() // 2, text_height))
+    screen.blit(points_label, (BORDER_SIZE, text_height))
+    screen.blit(attempts_label, (WIDTH // 2 + BORDER_SIZE - text_width // 2, text_height))
+    screen.set_clip(None)
+    return HUD_RECT
 
 def reset_grid():
     grid = [[True for _ in range(COLS)] for _ in range(ROWS)]
@@ -94,6 +114,10 @@ def main():
     animation_start_time = 0
     blink = False
     animation_duration = ANIMATION_TIME_WIN
+    clock = pygame.time.Clock()
+    full_redraw = True  # whole window on the next frame (the blink animation redraws every frame)
+    dirty_cells = []  # cells clicked since the last frame
+    shown_hud = None  # (points, attempts) currently on screen
 
     while run:
         for event in pygame.event.get():
@@ -107,6 +131,7 @@ def main():
                         if grid[row][col]:
                             pop_sound.play()  # Play the pop sound
                             grid[row][col] = False
+                            dirty_cells.append((row, col))
                             clicks += 1
                             if (row, col) in circles_pos:
                                 points += 1
@@ -119,23 +144,38 @@ def main():
                                 animation_start_time = pygame.time.get_ticks()
                                 circle_found = False
                                 animation_duration = ANIMATION_TIME_LOSE
+                                full_redraw = True  # the lose reveal doesn't change; draw it once
 
-        screen.fill(BACKGROUND)
         attempts_remaining = MAX_CLICKS - clicks
-        draw_text(points, attempts_remaining)
+        if (reveal_animation and circle_found) or full_redraw:
+            screen.fill(BACKGROUND)
+            draw_text(points, attempts_remaining)
+            draw_grid(grid, circles_pos, reveal=reveal_animation, blink=reveal_animation and circle_found)
+            pygame.display.flip()
+            full_redraw = False
+            shown_hud = (points, attempts_remaining)
+            dirty_cells.clear()
+        else:
+            # Only what a click changed: the clicked cells and, if the numbers moved, the HUD
+            dirty = [draw_cell(grid, circles_pos, row, col) for row, col in dirty_cells]
+            dirty_cells.clear()
+            if (points, attempts_remaining) != shown_hud:
+                dirty.append(draw_text(points, attempts_remaining))
+                shown_hud = (points, attempts_remaining)
+            if dirty:
+                pygame.display.update(dirty)
+
         if reveal_animation:
             current_time = pygame.time.get_ticks()
             if circle_found and (current_time - animation_start_time) % (2 * BLINK_INTERVAL) < BLINK_INTERVAL:
                 blink = not blink
-            draw_grid(grid, circles_pos, reveal=True, blink=circle_found)
             if current_time - animation_start_time > animation_duration:
                 grid, circles_pos, clicks = reset_grid()
                 reveal_animation = False
                 circle_found = False
                 blink = False
-        else:
-            draw_grid(grid, circles_pos)
-        pygame.display.flip()
+                full_redraw = True  # show the fresh board once, then go back to dirty rects
+        clock.tick(FPS)
 
     pygame.quit()
 